@@ -0,0 +1,217 @@
+from bloomfilter import BloomFilter
+from blocked_bloomfilter import BlockedBloomFilter
+from time import perf_counter, perf_counter_ns
+from datetime import datetime, timezone
+import numpy as np
+import argparse
+import platform
+import json
+import sys
+
+# Reproducible benchmark for the Bloom filter layouts
+# Keys are synthetic 64 bit numbers drawn from a seeded generator, so every run (and every
+#   version of the code) sees exactly the same data. Members are even numbers and
+#   non-members odd numbers, which keeps the two sets disjoint without a lookup table
+# They are used either as 8 byte strings or directly as a NumPy integer array
+# Keys are produced in chunks, so the key sets never have to exist in memory in full
+# For every (layout, num_items, false_pos_prob) the benchmark records insert and probe
+#   throughput, per call latency percentiles for single contains, the bytes of the bit
+#   buffer, and the measured false positive rate next to the target. Results are JSON
+LAYOUTS = {
+    "classic": BloomFilter,
+    "blocked": BlockedBloomFilter,
+}
+CHUNK_SIZE = 1 << 20
+LATENCY_PERCENTILES = [50, 90, 99, 99.9]
+
+
+# Stream num_keys distinct keys in chunks, members (parity 0) or non-members (parity 1)
+def generate_keys(num_keys, seed, parity, key_type="bytes", chunk_size=CHUNK_SIZE):
+    rng = np.random.default_rng([seed, parity])
+    remaining = num_keys
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        values = rng.integers(0, 1 << 62, size=count, dtype=np.uint64) * 2 + parity
+        remaining -= count
+        if key_type == "int":
+            yield values
+            continue
+        data = values.astype("<u8").tobytes()
+        yield [data[i : i + 8] for i in range(0, len(data), 8)]
+
+
+# The memory actually used by the filter's bits, not the size of the Python objects
+def buffer_bytes(bloom_filter):
+    if hasattr(bloom_filter, "blocks"):
+        return bloom_filter.blocks.nbytes
+    return bloom_filter.bit_array.nbytes
+
+
+# Time every contains call on its own. The timer itself adds a few tens of nanoseconds
+def probe_latencies(bloom_filter, keys):
+    latencies = np.empty(len(keys), dtype=np.int64)
+    for i, key in enumerate(keys):
+        start = perf_counter_ns()
+        bloom_filter.contains(key)
+        latencies[i] = perf_counter_ns() - start
+    return latencies
+
+
+def run_case(
+    layout, num_items, false_pos_prob, key_type, seed, max_probes, latency_probes
+):
+    bloom_filter = LAYOUTS[layout](false_pos_prob, num_items)
+
+    start_time = perf_counter()
+    for chunk in generate_keys(num_items, seed, 0, key_type):
+        bloom_filter.add_many(chunk)
+    insert_time = perf_counter() - start_time
+
+    num_probes = min(num_items, max_probes)
+    false_positives = 0
+    start_time = perf_counter()
+    for chunk in generate_keys(num_probes, seed, 1, key_type):
+        false_positives += int(bloom_filter.contains_many(chunk).sum())
+    probe_time = perf_counter() - start_time
+
+    # Re-inserted members must all be found, a Bloom filter has no false negatives
+    members = next(generate_keys(min(num_items, latency_probes), seed, 0, key_type))
+    false_negatives = int((~bloom_filter.contains_many(members)).sum())
+
+    absent = next(generate_keys(min(num_probes, latency_probes), seed, 1, key_type))
+    latencies = probe_latencies(bloom_filter, absent)
+    percentiles = np.percentile(latencies, LATENCY_PERCENTILES)
+
+    return {
+        "layout": layout,
+        "key_type": key_type,
+        "num_items": num_items,
+        "false_pos_prob": false_pos_prob,
+        "filter_size": bloom_filter.filter_size,
+        "num_hashes": bloom_filter.num_hashes,
+        "memory_bytes": buffer_bytes(bloom_filter),
+        "bits_per_item": bloom_filter.filter_size / num_items,
+        "insert_seconds": insert_time,
+        "inserts_per_second": num_items / insert_time,
+        "probe_seconds": probe_time,
+        "probes_per_second": num_probes / probe_time,
+        "scalar_probes_per_second": len(latencies) / (latencies.sum() / 1e9),
+        "latency_ns": {
+            f"p{p:g}": float(value)
+            for p, value in zip(LATENCY_PERCENTILES, percentiles)
+        },
+        "probes": num_probes,
+        "false_positives": false_positives,
+        "false_positive_rate": false_positives / num_probes,
+        "false_negatives": false_negatives,
+    }
+
+
+def run_benchmarks(
+    sizes,
+    probabilities,
+    layouts,
+    key_type="bytes",
+    seed=0,
+    max_probes=1_000_000,
+    latency_probes=10_000,
+):
+    results = []
+    for num_items in sizes:
+        for false_pos_prob in probabilities:
+            for layout in layouts:
+                result = run_case(
+                    layout,
+                    num_items,
+                    false_pos_prob,
+                    key_type,
+                    seed,
+                    max_probes,
+                    latency_probes,
+                )
+                results.append(result)
+                print(
+                    f"{layout:>8} n={num_items:<10} p={false_pos_prob:<8g}"
+                    f" insert {result['inserts_per_second']:>12,.0f}/s"
+                    f" probe {result['probes_per_second']:>12,.0f}/s"
+                    f" fp {result['false_positive_rate']:.5f}",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Bloom filter layouts")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10**4, 10**5, 10**6],
+        help="numbers of inserted items, anything from 10^4 to 10^8",
+    )
+    parser.add_argument(
+        "--probabilities",
+        type=float,
+        nargs="+",
+        default=[0.1, 0.01, 0.001, 0.0001],
+        help="target false positive probabilities",
+    )
+    parser.add_argument(
+        "--layouts", nargs="+", choices=sorted(LAYOUTS), default=sorted(LAYOUTS)
+    )
+    parser.add_argument(
+        "--key-type",
+        choices=["bytes", "int"],
+        default="bytes",
+        help="8 byte string keys or a NumPy uint64 array (the vectorized integer path)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--max-probes",
+        type=int,
+        default=1_000_000,
+        help="non-members probed per case to measure the false positive rate",
+    )
+    parser.add_argument(
+        "--latency-probes",
+        type=int,
+        default=10_000,
+        help="single contains calls timed per case for the latency percentiles",
+    )
+    parser.add_argument("--label", help="free form tag, e.g. a version or commit")
+    parser.add_argument("--output", help="write JSON here instead of to stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(
+        args.sizes,
+        args.probabilities,
+        args.layouts,
+        key_type=args.key_type,
+        seed=args.seed,
+        max_probes=args.max_probes,
+        latency_probes=args.latency_probes,
+    )
+    report = {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
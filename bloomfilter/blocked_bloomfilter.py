@@ -0,0 +1,91 @@
+from bloomfilter import hash_pair, hash_pairs, batches, splitmix64, SPLITMIX_GAMMA
+from bloomfilter import UINT64_MASK
+import numpy as np
+import math
+
+# A classic Bloom filter spreads an item's k bits over the whole bit array, so once the
+#   array no longer fits in cache every lookup costs up to k cache misses
+# A blocked Bloom filter first picks one 64 byte block (a cache line) for the item and then
+#   sets all k bits inside that block, so a lookup touches a single cache line
+# The price is a slightly higher false positive rate at the same memory, because items are
+#   not spread as evenly: some blocks end up fuller than others
+# Blocks are stored as rows of 8 uint64 words. The first hash half picks the block and the
+#   bits come from the second one by salted multiply-shift, as in the split block Bloom
+#   filters of Parquet and Impala: bit i is the top 9 bits of h2 * salt_i mod 2^64, with a
+#   different odd salt for every i. Each bit then depends on all 64 bits of h2. Double
+#   hashing inside a block (low + i * high mod 512) only uses 9 bits of each half, and
+#   collapses to a few distinct bits whenever high happens to be a multiple of 64
+BLOCK_BITS = 512
+BLOCK_WORDS = BLOCK_BITS // 64
+BLOCK_SHIFT = 64 - 9  # top log2(BLOCK_BITS) bits
+
+
+# The odd multipliers for the k bits of a block, from a fixed splitmix64 sequence
+def block_salts(num_hashes):
+    return [
+        splitmix64((i * SPLITMIX_GAMMA) & UINT64_MASK) | 1
+        for i in range(1, num_hashes + 1)
+    ]
+
+
+class BlockedBloomFilter:
+    # Same total size and number of hashes as BloomFilter, rounded up to whole blocks
+    def __init__(self, false_pos_prob, num_items):
+        bits = -(num_items * math.log(false_pos_prob)) / math.log(2) ** 2
+        self.num_blocks = max(1, math.ceil(bits / BLOCK_BITS))
+        self.filter_size = self.num_blocks * BLOCK_BITS
+        self.num_hashes = math.ceil(-math.log(false_pos_prob) / math.log(2))
+
+        self.salts = block_salts(self.num_hashes)
+
+        self.blocks = np.zeros((self.num_blocks, BLOCK_WORDS), dtype=np.uint64)
+
+    # The item's block and the k bit positions inside it
+    def positions(self, item):
+        h1, h2 = hash_pair(item)
+        block = h1 % self.num_blocks
+        bits = [((h2 * salt) & UINT64_MASK) >> BLOCK_SHIFT for salt in self.salts]
+        return block, bits
+
+    def add(self, item):
+        block, bits = self.positions(item)
+        words = self.blocks[block]
+        for bit in bits:
+            words[bit >> 6] |= np.uint64(1 << (bit & 63))
+
+    def contains(self, item):
+        block, bits = self.positions(item)
+        words = self.blocks[block].tolist()  # one cache line, as Python ints
+        for bit in bits:
+            if not words[bit >> 6] >> (bit & 63) & 1:
+                return False  # 100% not in the filter
+        return True  # Possibly in the filter
+
+    # Blocks and in-block bit positions for a whole batch
+    # Returns the flat word index into blocks.ravel() and the bit mask within that word,
+    #   each as a (len(items), num_hashes) array
+    def batch_words(self, batch):
+        pairs = hash_pairs(batch)
+        blocks = pairs[:, 0] % np.uint64(self.num_blocks)
+        salts = np.array(self.salts, dtype=np.uint64)
+        bits = (pairs[:, 1:] * salts) >> np.uint64(BLOCK_SHIFT)
+        words = blocks[:, None] * np.uint64(BLOCK_WORDS) + (bits >> np.uint64(6))
+        masks = np.left_shift(np.uint64(1), bits & np.uint64(63))
+        return words, masks
+
+    def add_many(self, items):
+        flat = self.blocks.ravel()
+        for batch in batches(items):
+            words, masks = self.batch_words(batch)
+            np.bitwise_or.at(flat, words.ravel(), masks.ravel())
+
+    # Vectorized probe: every item only reads words from its own block
+    def contains_many(self, items):
+        flat = self.blocks.ravel()
+        results = []
+        for batch in batches(items):
+            words, masks = self.batch_words(batch)
+            results.append(((flat[words] & masks) != 0).all(axis=1))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
@@ -1,9 +1,135 @@
 from bitarray import bitarray
-from faker import Faker
+from itertools import batched
+from mmap import mmap as memory_map, ACCESS_READ
+import numpy as np
 import mmh3
 import math
-import sys
-import random
+import struct
+
+# All k indexes of an item are derived from one 128 bit MurmurHash using double hashing
+#   (Kirsch-Mitzenmacher): g_i(x) = h1(x) + i * h2(x) mod m
+# Index arithmetic wraps at 64 bits so the Python and NumPy paths agree exactly
+UINT64_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Number of items hashed and indexed per NumPy batch in add_many/contains_many
+BATCH_SIZE = 65536
+
+
+# Keys can be str, bytes-like objects or integers
+# str keys are hashed as their UTF-8 bytes. bytes, bytearray and memoryview keys (e.g. slices
+#   of a larger buffer) are hashed in place without copying them into new bytes objects
+# Integer keys (Python ints and NumPy integers) are hashed arithmetically with the splitmix64
+#   finalizer instead of going through a string, so a NumPy integer array can be hashed
+#   in one vectorized step. They are taken modulo 2^64 (negative int64 IDs as two's
+#   complement), and the integer 5 is a different key from the string "5"
+SPLITMIX_GAMMA = 0x9E3779B97F4A7C15
+SPLITMIX_MULTIPLIERS = (0xBF58476D1CE4E5B9, 0x94D049BB133111EB)
+
+
+def splitmix64(x):
+    x = ((x ^ (x >> 30)) * SPLITMIX_MULTIPLIERS[0]) & UINT64_MASK
+    x = ((x ^ (x >> 27)) * SPLITMIX_MULTIPLIERS[1]) & UINT64_MASK
+    return x ^ (x >> 31)
+
+
+# The same finalizer over a uint64 array, where multiplication wraps on its own
+def splitmix64_array(x):
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(SPLITMIX_MULTIPLIERS[0])
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(SPLITMIX_MULTIPLIERS[1])
+    return x ^ (x >> np.uint64(31))
+
+
+# Two independent 64 bit hashes of an integer: the next two outputs of a splitmix64
+#   generator seeded with it
+def int_hash_pair(x):
+    x &= UINT64_MASK
+    return (
+        splitmix64((x + SPLITMIX_GAMMA) & UINT64_MASK),
+        splitmix64((x + 2 * SPLITMIX_GAMMA) & UINT64_MASK),
+    )
+
+
+# The two 64 bit halves of the item's hash: the 128 bit MurmurHash for str and bytes-like
+#   keys, the splitmix64 pair for integers
+def hash_pair(item):
+    if isinstance(item, str):
+        return mmh3.hash64(item, signed=False)
+    if isinstance(item, (int, np.integer)):
+        return int_hash_pair(int(item))
+    return mmh3.mmh3_x64_128_utupledigest(item, 0)
+
+
+# Hash pairs for a batch of items as a (len(items), 2) uint64 array
+# Integer NumPy arrays are hashed without a Python level loop
+def hash_pairs(items):
+    if isinstance(items, np.ndarray) and items.dtype.kind in "iu":
+        keys = items.astype(np.uint64)
+        return np.stack(
+            (
+                splitmix64_array(keys + np.uint64(SPLITMIX_GAMMA)),
+                splitmix64_array(keys + np.uint64(2 * SPLITMIX_GAMMA & UINT64_MASK)),
+            ),
+            axis=1,
+        )
+    pairs = np.fromiter(
+        (h for item in items for h in hash_pair(item)),
+        dtype=np.uint64,
+        count=2 * len(items),
+    )
+    return pairs.reshape(-1, 2)
+
+
+# Split items into batches for the NumPy paths. NumPy arrays are sliced so each batch stays
+#   an array (and can be hashed vectorized), anything else is grouped into tuples
+def batches(items, batch_size=BATCH_SIZE):
+    if isinstance(items, np.ndarray):
+        for start in range(0, len(items), batch_size):
+            yield items[start : start + batch_size]
+    else:
+        yield from batched(items, batch_size)
+
+
+# Items as something that can be indexed and iterated more than once, without turning
+#   NumPy arrays into lists of scalars
+def as_sequence(items):
+    if isinstance(items, np.ndarray):
+        return items
+    return list(items)
+
+
+# Indexes for every item in the batch as a (len(items), num_hashes) array
+# uint64 multiplication and addition wrap around like the UINT64_MASK in the scalar path
+def batch_indexes(pairs, num_hashes, size):
+    seeds = np.arange(num_hashes, dtype=np.uint64)
+    return (pairs[:, :1] + seeds * pairs[:, 1:]) % np.uint64(size)
+
+
+# On-disk format: a fixed 32 byte little endian header followed by the raw bit_array bytes
+# Header fields are magic, format version, hash scheme, filter_size and num_hashes
+# The header is padded so the bit data starts 8 byte aligned in the file (and in a mapping)
+FILE_MAGIC = b"BLMF"
+FILE_VERSION = 1
+HASH_SCHEME_MMH3_DOUBLE = 1  # mmh3.hash64 halves combined with double hashing
+FILE_HEADER = struct.Struct("<4sHHQI12x")
+
+
+# Validate a saved filter's header and return its (filter_size, num_hashes)
+# exact_size=False allows trailing bytes, e.g. when the data is a page rounded memory block
+def read_header(data, path, exact_size=True):
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{path} is too small to be a Bloom filter file")
+    magic, version, scheme, filter_size, num_hashes = FILE_HEADER.unpack_from(data)
+    if magic != FILE_MAGIC:
+        raise ValueError(f"{path} is not a Bloom filter file")
+    if version != FILE_VERSION:
+        raise ValueError(f"{path} has unsupported format version {version}")
+    if scheme != HASH_SCHEME_MMH3_DOUBLE:
+        raise ValueError(f"{path} uses unknown hash scheme {scheme}")
+    expected_size = FILE_HEADER.size + math.ceil(filter_size / 8)
+    if len(data) < expected_size or (exact_size and len(data) != expected_size):
+        raise ValueError(f"{path} is truncated or has trailing data")
+    return filter_size, num_hashes
+
 
 # Bloom filters are probabilistic data strucures that can be used in place
 # of a set (if rare false positives are acceptable) for considerable space
@@ -39,95 +165,170 @@ class BloomFilter:
     def calculate_number_hashes(self, false_pos_prob):
         return -math.log(false_pos_prob) / math.log(2)
 
-    # Using 0..num_hashes as a seed for the MurmurHash, we get multiple different hash values
-    #   for the same index and set each to 1
-    def add(self, item):
+    # The k bit array indexes associated with an item, derived from a single hash
+    def indexes(self, item):
+        h1, h2 = hash_pair(item)
         for i in range(self.num_hashes):
-            hash = mmh3.hash(item, i) % self.filter_size
-            self.bit_array[hash] = 1
+            yield ((h1 + i * h2) & UINT64_MASK) % self.filter_size
+
+    # Each of the item's indexes in the bit array is set to 1
+    def add(self, item):
+        for index in self.indexes(item):
+            self.bit_array[index] = 1
 
-    # Using 0..num_hashes as a seed for the MurmurHash, we get the items's associated hash
-    #   values and make sure each is 1 to determine if the item is possibly in the set
+    # We get the items's associated indexes and make sure each is 1 to determine
+    #   if the item is possibly in the set
     # If any index is 0, we can say with certainty that the item is not in the set
     def contains(self, item):
-        for i in range(self.num_hashes):
-            hash = mmh3.hash(item, i) % self.filter_size
-            if self.bit_array[hash] == 0:
+        for index in self.indexes(item):
+            if self.bit_array[index] == 0:
                 return False  # 100% not in the filter
         return True  # Possibly in the filter
 
+    # The bit array viewed as bytes so whole batches of bits can be set and tested
+    # bitarray defaults to big endian: bit i lives in byte i // 8 at position 7 - i % 8
+    def bytes_view(self):
+        return np.frombuffer(self.bit_array, dtype=np.uint8)
+
+    # Batched add: one hash per item, then all indexes of the batch are set at once
+    # ufunc.at does not honour read-only arrays, so mapped filters are rejected up front
+    def add_many(self, items):
+        if self.bit_array.readonly:
+            raise TypeError("cannot modify read-only memory")
+        for batch in batches(items):
+            indexes = batch_indexes(
+                hash_pairs(batch), self.num_hashes, self.filter_size
+            )
+            self.set_bits(indexes.ravel())
+
+    # Set the bits at all of the given indexes through the byte view of the bit array
+    def set_bits(self, indexes):
+        masks = np.left_shift(1, 7 - (indexes & 7)).astype(np.uint8)
+        np.bitwise_or.at(self.bytes_view(), indexes >> 3, masks)
+
+    # Batched contains, returning a boolean NumPy array with one entry per item
+    def contains_many(self, items):
+        buffer = self.bytes_view()
+        results = []
+        for batch in batches(items):
+            indexes = batch_indexes(
+                hash_pairs(batch), self.num_hashes, self.filter_size
+            )
+            bits = (buffer[indexes >> 3] >> (7 - (indexes & 7)).astype(np.uint8)) & 1
+            results.append(bits.all(axis=1))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    # Filters can only be combined bit by bit if every item maps to the same indexes in both
+    def check_compatible(self, other):
+        if (self.filter_size, self.num_hashes) != (other.filter_size, other.num_hashes):
+            raise ValueError(
+                "Bloom filters need the same filter_size and num_hashes to be combined"
+            )
 
-def generate_emails(num_items=1000):
-    fake = Faker()
+    # A new in-memory filter holding the given bytes as its bit array
+    def with_bytes(self, data):
+        bloom_filter = BloomFilter.__new__(BloomFilter)
+        bloom_filter.filter_size = self.filter_size
+        bloom_filter.num_hashes = self.num_hashes
+        bloom_filter.bit_array = bitarray(endian="big")
+        bloom_filter.bit_array.frombytes(data.tobytes())
+        del bloom_filter.bit_array[self.filter_size :]
+        return bloom_filter
 
-    valid_emails = set()  # emails inserted into Bloom filter
-    test_emails = set()  # subset of emails in the Bloom filter
-    invalid_emails = set()  # emails that are not in the Bloom filter
+    # The union of two filters is exactly the filter we would get by adding the items of
+    #   both, so shards can be merged without re-hashing any keys
+    def union(self, other):
+        self.check_compatible(other)
+        return self.with_bytes(np.bitwise_or(self.bytes_view(), other.bytes_view()))
 
-    while len(valid_emails) < num_items:
-        email = fake.email()
-        valid_emails.add(email)
-        # Take roughly have the dataset for testing membership
-        if random.choice([0, 1]) == 1:
-            test_emails.add(email)
+    # The intersection contains every item in both sets, but it has more bits set than a
+    #   filter built from only the common items would, so its false positive rate is higher
+    def intersection(self, other):
+        self.check_compatible(other)
+        return self.with_bytes(np.bitwise_and(self.bytes_view(), other.bytes_view()))
 
-    # Non existent elements for testing non membership
-    while len(invalid_emails) < num_items:
-        email = fake.email()
-        if email not in valid_emails:
-            invalid_emails.add(fake.email())
+    def __or__(self, other):
+        return self.union(other)
 
-    return list(valid_emails), list(test_emails), list(invalid_emails)
+    def __and__(self, other):
+        return self.intersection(other)
 
+    def __ior__(self, other):
+        self.check_compatible(other)
+        buffer = self.bytes_view()
+        np.bitwise_or(buffer, other.bytes_view(), out=buffer)
+        return self
 
+    def __iand__(self, other):
+        self.check_compatible(other)
+        buffer = self.bytes_view()
+        np.bitwise_and(buffer, other.bytes_view(), out=buffer)
+        return self
+
+    # Fraction of bits that are set
+    def fill_ratio(self):
+        return self.bit_array.count(1) / self.filter_size
+
+    # Estimated number of distinct items added, from the number of set bits X
+    # Calculated as n = -(m/k) * ln(1 - X/m) (Swamidass & Baldi 2007)
+    # A completely full filter gives no information and returns infinity
+    def approx_len(self):
+        fill = self.fill_ratio()
+        if fill >= 1:
+            return math.inf
+        return -(self.filter_size / self.num_hashes) * math.log(1 - fill)
+
+    # A false positive needs all k bits of an item to be set by chance, so with the current
+    #   fill ratio f the false positive rate is f^k
+    # Once this drifts above the target the filter is overfull and should be resized
+    def estimated_false_positive_rate(self):
+        return self.fill_ratio() ** self.num_hashes
+
+    def header(self):
+        return FILE_HEADER.pack(
+            FILE_MAGIC,
+            FILE_VERSION,
+            HASH_SCHEME_MMH3_DOUBLE,
+            self.filter_size,
+            self.num_hashes,
+        )
+
+    # Write the header and the raw bit array so the filter can be reopened without rebuilding
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.header())
+            f.write(self.bit_array.tobytes())
+
+    # Load a filter written by save
+    # With mmap=True the file is mapped read-only and the bit array points straight into
+    #   the mapping: opening is O(1) and every process on the host shares the page cache copy
+    #   (the filter cannot be added to, and its bit_array is padded to a whole number of bytes)
+    # With mmap=False the bits are copied into a regular, writable bitarray
+    @classmethod
+    def open(cls, path, mmap=True):
+        with open(path, "rb") as f:
+            if mmap:
+                data = memory_map(f.fileno(), 0, access=ACCESS_READ)
+            else:
+                data = f.read()
+
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.filter_size, bloom_filter.num_hashes = read_header(data, path)
+
+        bits = memoryview(data)[FILE_HEADER.size :]
+        if mmap:
+            bloom_filter.bit_array = bitarray(buffer=bits, endian="big")
+        else:
+            bloom_filter.bit_array = bitarray(endian="big")
+            bloom_filter.bit_array.frombytes(bits)
+            del bloom_filter.bit_array[bloom_filter.filter_size :]
+        return bloom_filter
+
+
+# Benchmarks and accuracy measurements live in benchmark.py
 if __name__ == "__main__":
-    # Random data
-    valid_emails, test_emails, invalid_emails = generate_emails(10000)
-
-    false_pos_prob = 0.01
-    bloom_filter = BloomFilter(false_pos_prob, len(valid_emails))
-    for email in valid_emails:
-        bloom_filter.add(email)
-
-    false_positives = 0
-    false_negatives = 0
-
-    # Check if invalid emails are in the bloom filter -> false positives
-    for email in invalid_emails:
-        if bloom_filter.contains(email):
-            false_positives += 1
-
-    # Check if valid emails are not in the bloom filter -> false negatives
-    for email in test_emails:
-        if not bloom_filter.contains(email):
-            false_negatives += 1
-
-    # Estimate size of a set implementation
-    # A set would not have false positives but would take up much more space
-    email_set = set(valid_emails)
-    set_size = sys.getsizeof(email_set)
-    set_total_email_size = sum(sys.getsizeof(email) for email in email_set)
-    total_set_size = set_size + set_total_email_size
-
-    # Get size of bloom filter
-    bf_instance_size = sys.getsizeof(bloom_filter)  # Instance size
-    bf_bitarray_size = sys.getsizeof(bloom_filter.bit_array)
-    bf_num_hashes_size = sys.getsizeof(bloom_filter.num_hashes)
-    total_bf_size = bf_instance_size + bf_bitarray_size + bf_num_hashes_size
-
-    size_diff = (total_set_size - total_bf_size) / (total_set_size) * 100
-
-    print("Memory:")
-    print(f"    Bloom filter memory: {total_bf_size} bytes")
-    print(f"    Set version  memory: {total_set_size} bytes")
-    print(f"    Saved {size_diff:.2f}% space!")
-
-    print()
-
-    print("Bloom Filter Stats:")
-    print(f"    Filter size: {bloom_filter.filter_size}")
-    print(f"    Number of hash functions: {bloom_filter.num_hashes}")
-    print(f"    False positives: {false_positives}")
-    print(f"    False positive rate: {false_positives / len(valid_emails)}")
-    print(f"    False negatives: {false_negatives}")
-    print(f"    False negative rate: {false_negatives / len(invalid_emails)}")
+    import benchmark
+
+    benchmark.main()
@@ -0,0 +1,189 @@
+from bloomfilter import (
+    hash_pair,
+    hash_pairs,
+    batch_indexes,
+    batches,
+    as_sequence,
+    UINT64_MASK,
+)
+from time import monotonic
+import numpy as np
+import math
+
+# A counting Bloom filter replaces every bit with a small counter so items can be removed
+# Adding an item increments its k counters, removing it decrements them, and an item
+#   is possibly in the set while all of its counters are non-zero
+# Counters are 4 bits wide and packed two per byte in a NumPy uint8 array, so the filter
+#   takes 4 times the memory of a BloomFilter of the same size rather than a Python int each
+# 4 bits is plenty: a counter only overflows if 16 items share the same index, which for
+#   a correctly sized filter is astronomically unlikely. Counters saturate at 15 and are
+#   then never decremented, since we no longer know their true count and decrementing
+#   could introduce false negatives
+COUNTER_MAX = 15
+
+
+# Read the 4 bit counter at index from the packed array
+# Even indexes live in the low nibble of their byte, odd indexes in the high nibble
+def get_counter(counters, index):
+    return (int(counters[index >> 1]) >> ((index & 1) * 4)) & 0xF
+
+
+def set_counter(counters, index, value):
+    shift = (index & 1) * 4
+    byte = int(counters[index >> 1])
+    counters[index >> 1] = (byte & ~(0xF << shift) & 0xFF) | (value << shift)
+
+
+class CountingBloomFilter:
+    # Sized exactly like BloomFilter: m = -(n*ln(p))/(ln(2))^2 counters and -ln(p)/ln(2) hashes
+    def __init__(self, false_pos_prob, num_items):
+        self.filter_size = math.ceil(
+            -(num_items * math.log(false_pos_prob)) / math.log(2) ** 2
+        )
+        self.num_hashes = math.ceil(-math.log(false_pos_prob) / math.log(2))
+
+        self.counters = np.zeros(math.ceil(self.filter_size / 2), dtype=np.uint8)
+
+    # The k counter indexes of an item, using the same double hashing as BloomFilter
+    def indexes(self, item):
+        h1, h2 = hash_pair(item)
+        for i in range(self.num_hashes):
+            yield ((h1 + i * h2) & UINT64_MASK) % self.filter_size
+
+    def add(self, item):
+        for index in self.indexes(item):
+            count = get_counter(self.counters, index)
+            if count < COUNTER_MAX:
+                set_counter(self.counters, index, count + 1)
+
+    def contains(self, item):
+        for index in self.indexes(item):
+            if get_counter(self.counters, index) == 0:
+                return False  # 100% not in the filter
+        return True  # Possibly in the filter
+
+    # Removing an item that was never added would decrement counters that belong to other
+    #   items and cause false negatives, so only items that are possibly present are removed
+    # Returns whether the item was removed
+    def remove(self, item):
+        if not self.contains(item):
+            return False
+        for index in self.indexes(item):
+            count = get_counter(self.counters, index)
+            if count < COUNTER_MAX:
+                set_counter(self.counters, index, count - 1)
+        return True
+
+    # Add delta times the number of occurrences of each index to its counter, saturating at
+    #   COUNTER_MAX (and never moving a saturated counter)
+    # Two neighbouring counters share a byte, so low and high nibbles are updated in
+    #   separate passes where every byte is written at most once
+    def update_counters(self, indexes, delta):
+        indexes, occurrences = np.unique(indexes, return_counts=True)
+        for nibble in (0, 1):
+            selected = (indexes & 1) == nibble
+            positions = indexes[selected] >> 1
+            shift = np.uint8(4 * nibble)
+            keep = np.uint8(0xF0 if nibble == 0 else 0x0F)
+
+            packed = self.counters[positions]
+            counts = ((packed >> shift) & 0xF).astype(np.int64)
+            updated = np.clip(counts + delta * occurrences[selected], 0, COUNTER_MAX)
+            counts = np.where(counts == COUNTER_MAX, counts, updated).astype(np.uint8)
+            self.counters[positions] = (packed & keep) | (counts << shift)
+
+    # Counter values for every index of the batch as a (len(items), num_hashes) array
+    def batch_counts(self, batch):
+        indexes = batch_indexes(hash_pairs(batch), self.num_hashes, self.filter_size)
+        shifts = ((indexes & 1) * 4).astype(np.uint8)
+        return indexes, (self.counters[indexes >> 1] >> shifts) & 0xF
+
+    def add_many(self, items):
+        for batch in batches(items):
+            indexes = batch_indexes(
+                hash_pairs(batch), self.num_hashes, self.filter_size
+            )
+            self.update_counters(indexes.ravel(), 1)
+
+    def contains_many(self, items):
+        results = []
+        for batch in batches(items):
+            _, counts = self.batch_counts(batch)
+            results.append((counts > 0).all(axis=1))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    # Batched remove, returning a boolean NumPy array of which items were removed
+    def remove_many(self, items):
+        results = []
+        for batch in batches(items):
+            indexes, counts = self.batch_counts(batch)
+            present = (counts > 0).all(axis=1)
+            self.update_counters(indexes[present].ravel(), -1)
+            results.append(present)
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def clear(self):
+        self.counters.fill(0)
+
+
+# Time windowed mode: items age out on their own instead of being removed one by one
+# The window is split into generations, each a CountingBloomFilter. Inserts go to the
+#   newest generation and lookups check all of them. Once a generation's share of the window
+#   has elapsed, the oldest generation is cleared and reused as the newest one
+# An item is therefore remembered for between window * (generations - 1) / generations
+#   and window seconds after it was last added, and nothing is ever rebuilt from scratch
+class WindowedCountingBloomFilter:
+    def __init__(
+        self, false_pos_prob, num_items, window, generations=4, clock=monotonic
+    ):
+        # num_items is the number of items expected within one generation
+        self.generation_span = window / generations
+        self.clock = clock
+        self.generations = [
+            CountingBloomFilter(false_pos_prob / generations, num_items)
+            for _ in range(generations)
+        ]
+        self.rotated_at = clock()
+
+    # Retire every generation whose time has run out since the last rotation
+    def rotate(self):
+        now = self.clock()
+        elapsed = int((now - self.rotated_at) // self.generation_span)
+        for _ in range(min(elapsed, len(self.generations))):
+            oldest = self.generations.pop(0)
+            oldest.clear()
+            self.generations.append(oldest)
+        if elapsed:
+            self.rotated_at += elapsed * self.generation_span
+
+    def add(self, item):
+        self.rotate()
+        self.generations[-1].add(item)
+
+    def contains(self, item):
+        self.rotate()
+        return any(
+            generation.contains(item) for generation in reversed(self.generations)
+        )
+
+    # Removes the item from every generation that (possibly) holds it
+    def remove(self, item):
+        self.rotate()
+        removed = [generation.remove(item) for generation in self.generations]
+        return any(removed)
+
+    def add_many(self, items):
+        self.rotate()
+        self.generations[-1].add_many(items)
+
+    def contains_many(self, items):
+        self.rotate()
+        items = as_sequence(items)
+        found = np.zeros(len(items), dtype=bool)
+        for generation in self.generations:
+            found |= generation.contains_many(items)
+        return found
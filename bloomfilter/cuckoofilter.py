@@ -0,0 +1,352 @@
+from bloomfilter import hash_pair, hash_pairs, batches
+from mmap import mmap as memory_map, ACCESS_READ
+import numpy as np
+import random
+import struct
+import math
+
+# A cuckoo filter (Fan et al. 2014) stores a small fingerprint of every item in a table of
+#   buckets instead of setting bits. Each item has two candidate buckets and its fingerprint
+#   sits in one of them, so a lookup reads at most two buckets and an item can be removed
+#   by deleting its fingerprint
+# The second bucket is derived from the first and the fingerprint alone:
+#   i2 = (n - 1 - i1 - hash(fingerprint)) mod n for n buckets. Applying it twice gives i1
+#   back, so a fingerprint can be moved to its other bucket without knowing the original
+#   item, and unlike the usual i1 xor hash(fingerprint) it works for any n, not only
+#   powers of two. That is what makes cuckoo eviction possible: when
+#   both buckets are full, a random resident is kicked out to its alternate bucket, which
+#   may kick out another one, and so on
+# A lookup compares the fingerprint against 2 * bucket_size slots, so the false positive
+#   rate is about 2 * bucket_size / 2^fingerprint_bits. At a load of 95% that costs
+#   log2(2 * bucket_size / p) / 0.95 bits per item, which for low targets (<= 0.1%) is
+#   fewer than the 1.44 * log2(1/p) a Bloom filter needs
+# That only holds if no space is wasted, so the fingerprints are bit packed: slot j of
+#   bucket i takes fingerprint_bits bits at bit offset (i * bucket_size + j) *
+#   fingerprint_bits of a uint64 word array, and the table has exactly as many buckets as
+#   the target load needs. A slot may straddle two words, lookups read both with shifts
+#   and masks, vectorized over whole batches
+# 0 marks an empty slot, so fingerprints are never 0
+# Adding the same item more than 2 * bucket_size times cannot succeed: all copies compete
+#   for the same two buckets
+MAX_LOAD_FACTOR = 0.95  # achievable load with 4 slots per bucket
+FINGERPRINT_MULTIPLIER = 0x5BD1E995  # MurmurHash2 mixing constant
+
+# Same on-disk story as BloomFilter: a fixed little endian header followed by the raw
+#   packed table, which can be memory mapped read-only
+# Header fields are magic, format version, hash scheme, num_buckets, bucket_size,
+#   fingerprint_bits, count, victim bucket (-1 if none) and victim fingerprint
+FILE_MAGIC = b"CKOF"
+FILE_VERSION = 2  # 2: bit packed fingerprints, any number of buckets
+HASH_SCHEME_MMH3_PARTIAL_KEY = 1  # mmh3.hash64 halves, partial key cuckoo hashing
+FILE_HEADER = struct.Struct("<4sHHQIIQqI4x")
+
+
+MAX_FINGERPRINT_BITS = 32
+
+
+# Words of the packed table, plus one so a slot in the last word can read its neighbour
+def table_words(num_buckets, bucket_size, fingerprint_bits):
+    return math.ceil(num_buckets * bucket_size * fingerprint_bits / 64) + 1
+
+
+class CuckooFilter:
+    def __init__(self, false_pos_prob, num_items, bucket_size=4, max_kicks=500, seed=0):
+        self.bucket_size = bucket_size
+        self.max_kicks = max_kicks
+        self.random = random.Random(seed)
+
+        self.num_buckets = max(
+            1, math.ceil(num_items / (bucket_size * MAX_LOAD_FACTOR))
+        )
+        self.fingerprint_bits = math.ceil(math.log2(2 * bucket_size / false_pos_prob))
+        if self.fingerprint_bits > MAX_FINGERPRINT_BITS:
+            raise ValueError(f"fingerprints are limited to {MAX_FINGERPRINT_BITS} bits")
+
+        self.table = np.zeros(
+            table_words(self.num_buckets, bucket_size, self.fingerprint_bits),
+            dtype=np.uint64,
+        )
+        self.count = 0
+        # Fingerprint left over when an insert ran out of kicks, see insert
+        self.victim = None
+
+    def __len__(self):
+        return self.count
+
+    # Fraction of slots in use
+    def load_factor(self):
+        return self.count / (self.num_buckets * self.bucket_size)
+
+    # Memory used by the fingerprint table in bytes
+    @property
+    def memory_bytes(self):
+        return self.table.nbytes
+
+    # First bucket and fingerprint from the two halves of the item's hash
+    def locate(self, item):
+        h1, h2 = hash_pair(item)
+        fingerprint = h2 & ((1 << self.fingerprint_bits) - 1) or 1
+        return h1 % self.num_buckets, fingerprint
+
+    # The other bucket of a fingerprint, works in both directions
+    def alt_index(self, index, fingerprint):
+        mixed = (fingerprint * FINGERPRINT_MULTIPLIER) & 0xFFFFFFFF
+        return (self.num_buckets - 1 - index - mixed) % self.num_buckets
+
+    # Buckets and fingerprints for a whole batch as arrays
+    # The alternate index is kept non-negative in uint64: n - 1 - i1 >= 0 and
+    #   n - (hash mod n) >= 1
+    def batch_locate(self, batch):
+        pairs = hash_pairs(batch)
+        n = np.uint64(self.num_buckets)
+        fingerprints = pairs[:, 1] & np.uint64((1 << self.fingerprint_bits) - 1)
+        fingerprints[fingerprints == 0] = 1
+        first = pairs[:, 0] % n
+        mixed = (fingerprints * np.uint64(FINGERPRINT_MULTIPLIER)) & np.uint64(
+            0xFFFFFFFF
+        )
+        second = (n - np.uint64(1) - first + n - mixed % n) % n
+        return first, second, fingerprints
+
+    # Bit offsets of the slots of the given buckets, one row of bucket_size per bucket
+    def slot_offsets(self, indexes):
+        slots = np.asarray(indexes, dtype=np.uint64)[..., None] * np.uint64(
+            self.bucket_size
+        ) + np.arange(self.bucket_size, dtype=np.uint64)
+        return slots * np.uint64(self.fingerprint_bits)
+
+    # Fingerprints at the given bit offsets. A slot that runs past the end of its word
+    #   gets its high bits from the next one
+    def read_slots(self, offsets):
+        words = offsets >> np.uint64(6)
+        shifts = offsets & np.uint64(63)
+        values = self.table[words] >> shifts
+        straddles = shifts + np.uint64(self.fingerprint_bits) > 64
+        high = self.table[words + np.uint64(1)] << (
+            (np.uint64(64) - shifts) & np.uint64(63)
+        )
+        values |= np.where(straddles, high, np.uint64(0))
+        return values & np.uint64((1 << self.fingerprint_bits) - 1)
+
+    # The scalar paths below work on Python ints, which is much faster than NumPy for a
+    #   single bucket of a few slots
+    def slot_offset(self, index, slot):
+        return (index * self.bucket_size + slot) * self.fingerprint_bits
+
+    def write_slot(self, index, slot, fingerprint):
+        word, shift = divmod(self.slot_offset(index, slot), 64)
+        mask = (1 << self.fingerprint_bits) - 1
+        pair = self.table.item(word) | self.table.item(word + 1) << 64
+        pair = pair & ~(mask << shift) | fingerprint << shift
+        self.table[word] = pair & 0xFFFFFFFFFFFFFFFF
+        self.table[word + 1] = pair >> 64
+
+    # The fingerprints in a bucket as a list
+    def bucket(self, index):
+        word, shift = divmod(self.slot_offset(index, 0), 64)
+        last = (shift + self.bucket_size * self.fingerprint_bits - 1) // 64
+        bits = 0
+        for i in range(last + 1):
+            bits |= self.table.item(word + i) << 64 * i
+        bits >>= shift
+        mask = (1 << self.fingerprint_bits) - 1
+        return [
+            bits >> slot * self.fingerprint_bits & mask
+            for slot in range(self.bucket_size)
+        ]
+
+    # Put the fingerprint in an empty slot of the bucket if there is one
+    def insert_into(self, index, fingerprint):
+        fingerprints = self.bucket(index)
+        if 0 not in fingerprints:
+            return False
+        self.write_slot(index, fingerprints.index(0), fingerprint)
+        return True
+
+    # Once an insert fails, its last evicted fingerprint is kept aside as the victim so no
+    #   item already in the filter is lost, and the filter reports itself full: further
+    #   adds return False until a remove frees up room
+    def insert(self, first, fingerprint):
+        if self.victim is not None:
+            return False
+        second = self.alt_index(first, fingerprint)
+        if self.insert_into(first, fingerprint) or self.insert_into(
+            second, fingerprint
+        ):
+            self.count += 1
+            return True
+
+        index = self.random.choice((first, second))
+        for _ in range(self.max_kicks):
+            slot = self.random.randrange(self.bucket_size)
+            evicted = self.bucket(index)[slot]
+            self.write_slot(index, slot, fingerprint)
+            fingerprint = evicted
+            index = self.alt_index(index, fingerprint)
+            if self.insert_into(index, fingerprint):
+                self.count += 1
+                return True
+
+        self.victim = (index, fingerprint)
+        self.count += 1
+        return True
+
+    def add(self, item):
+        return self.insert(*self.locate(item))
+
+    def is_victim(self, first, second, fingerprint):
+        return self.victim in ((first, fingerprint), (second, fingerprint))
+
+    def lookup(self, first, fingerprint):
+        second = self.alt_index(first, fingerprint)
+        if self.is_victim(first, second, fingerprint):
+            return True
+        return fingerprint in self.bucket(first) or fingerprint in self.bucket(second)
+
+    def contains(self, item):
+        return self.lookup(*self.locate(item))
+
+    # Only remove items that were added, otherwise another item sharing the fingerprint
+    #   and bucket loses its entry
+    def delete(self, first, fingerprint):
+        second = self.alt_index(first, fingerprint)
+        for index in (first, second):
+            fingerprints = self.bucket(index)
+            if fingerprint in fingerprints:
+                self.write_slot(index, fingerprints.index(fingerprint), 0)
+                self.count -= 1
+                self.reinsert_victim()
+                return True
+        if self.is_victim(first, second, fingerprint):
+            self.victim = None
+            self.count -= 1
+            return True
+        return False
+
+    # A removal may have made room for the victim
+    def reinsert_victim(self):
+        if self.victim is None:
+            return
+        index, fingerprint = self.victim
+        self.victim = None
+        self.count -= 1
+        self.insert(index, fingerprint)
+
+    def remove(self, item):
+        return self.delete(*self.locate(item))
+
+    # Batched variants hash the whole batch at once with NumPy
+    # Inserts and removes still place fingerprints one at a time, since every placement
+    #   can depend on the previous one. All of them return a boolean array per item
+    def add_many(self, items):
+        results = []
+        for batch in batches(items):
+            first, _, fingerprints = self.batch_locate(batch)
+            placed = [
+                self.insert(index, fingerprint)
+                for index, fingerprint in zip(first.tolist(), fingerprints.tolist())
+            ]
+            results.append(np.array(placed, dtype=bool))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    # Fully vectorized: both candidate buckets of every item are compared at once
+    def contains_many(self, items):
+        results = []
+        for batch in batches(items):
+            first, second, fingerprints = self.batch_locate(batch)
+            found = np.zeros(len(fingerprints), dtype=bool)
+            for index in (first, second):
+                slots = self.read_slots(self.slot_offsets(index))
+                found |= (slots == fingerprints[:, None]).any(axis=1)
+            if self.victim is not None:
+                index, fingerprint = self.victim
+                found |= (fingerprints == fingerprint) & (
+                    (first == index) | (second == index)
+                )
+            results.append(found)
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def remove_many(self, items):
+        results = []
+        for batch in batches(items):
+            first, _, fingerprints = self.batch_locate(batch)
+            placed = [
+                self.delete(index, fingerprint)
+                for index, fingerprint in zip(first.tolist(), fingerprints.tolist())
+            ]
+            results.append(np.array(placed, dtype=bool))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def header(self):
+        victim_index, victim_fingerprint = self.victim or (-1, 0)
+        return FILE_HEADER.pack(
+            FILE_MAGIC,
+            FILE_VERSION,
+            HASH_SCHEME_MMH3_PARTIAL_KEY,
+            self.num_buckets,
+            self.bucket_size,
+            self.fingerprint_bits,
+            self.count,
+            victim_index,
+            victim_fingerprint,
+        )
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.header())
+            f.write(self.table.tobytes())
+
+    # Load a filter written by save
+    # With mmap=True the packed table is a read-only view of the mapped file, shared by
+    #   every process that opens it. With mmap=False it is copied into a writable array
+    @classmethod
+    def open(cls, path, mmap=True, max_kicks=500, seed=0):
+        with open(path, "rb") as f:
+            if mmap:
+                data = memory_map(f.fileno(), 0, access=ACCESS_READ)
+            else:
+                data = f.read()
+
+        if len(data) < FILE_HEADER.size:
+            raise ValueError(f"{path} is too small to be a cuckoo filter file")
+        (
+            magic,
+            version,
+            scheme,
+            num_buckets,
+            bucket_size,
+            fingerprint_bits,
+            count,
+            victim_index,
+            victim_fingerprint,
+        ) = FILE_HEADER.unpack_from(data)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a cuckoo filter file")
+        if version != FILE_VERSION:
+            raise ValueError(f"{path} has unsupported format version {version}")
+        if scheme != HASH_SCHEME_MMH3_PARTIAL_KEY:
+            raise ValueError(f"{path} uses unknown hash scheme {scheme}")
+        table_size = 8 * table_words(num_buckets, bucket_size, fingerprint_bits)
+        if len(data) != FILE_HEADER.size + table_size:
+            raise ValueError(f"{path} is truncated or has trailing data")
+
+        cuckoo_filter = cls.__new__(cls)
+        cuckoo_filter.num_buckets = num_buckets
+        cuckoo_filter.bucket_size = bucket_size
+        cuckoo_filter.fingerprint_bits = fingerprint_bits
+        cuckoo_filter.count = count
+        cuckoo_filter.victim = (
+            (victim_index, victim_fingerprint) if victim_index >= 0 else None
+        )
+        cuckoo_filter.max_kicks = max_kicks
+        cuckoo_filter.random = random.Random(seed)
+
+        table = np.frombuffer(data, dtype=np.uint64, offset=FILE_HEADER.size)
+        cuckoo_filter.table = table if mmap else table.copy()
+        return cuckoo_filter
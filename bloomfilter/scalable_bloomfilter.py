@@ -0,0 +1,94 @@
+from bloomfilter import BloomFilter, batches, as_sequence, hash_pairs
+import numpy as np
+import math
+
+# A regular Bloom filter is sized for num_items up front. Past that point its bits fill up
+#   and the real false positive rate climbs far above the target
+# A scalable Bloom filter (Almeida et al. 2007) is a chain of regular Bloom filters:
+#   when the newest one reaches its capacity, a larger one with a tighter error is appended
+# Filter i holds num_items * growth^i items with error p0 * tightening^i where
+#   p0 = false_pos_prob * (1 - tightening). The errors form a geometric series, so the
+#   compound false positive rate stays below false_pos_prob no matter how many filters
+#   are added: sum(p0 * r^i) = p0 / (1 - r) = false_pos_prob
+# Only the newest filter is written to, every filter is checked on lookups
+
+
+class ScalableBloomFilter:
+    def __init__(self, false_pos_prob, num_items, growth=2, tightening=0.5):
+        self.false_pos_prob = false_pos_prob
+        self.initial_items = num_items
+        self.growth = growth
+        self.tightening = tightening
+
+        self.filters = []
+        self.capacities = []
+        self.count = 0  # items inserted into the whole chain
+        self.current_count = 0  # items inserted into the newest filter
+        self.add_filter()
+
+    # Append the next filter in the chain with geometrically larger capacity and smaller error
+    def add_filter(self):
+        i = len(self.filters)
+        capacity = math.ceil(self.initial_items * self.growth**i)
+        error = self.false_pos_prob * (1 - self.tightening) * self.tightening**i
+        self.filters.append(BloomFilter(error, capacity))
+        self.capacities.append(capacity)
+        self.current_count = 0
+
+    # Total number of items the chain can hold before the next filter is added
+    @property
+    def capacity(self):
+        return sum(self.capacities)
+
+    def __len__(self):
+        return self.count
+
+    # Items that are already (possibly) present are not inserted again, so duplicates do not
+    #   use up capacity and trigger needless growth
+    def add(self, item):
+        if self.contains(item):
+            return
+        if self.current_count >= self.capacities[-1]:
+            self.add_filter()
+        self.filters[-1].add(item)
+        self.current_count += 1
+        self.count += 1
+
+    # An item may be in the set if any filter in the chain may contain it
+    def contains(self, item):
+        return any(
+            bloom_filter.contains(item) for bloom_filter in reversed(self.filters)
+        )
+
+    # Batched add: new items are split into runs that fit the remaining capacity of the
+    #   newest filter, growing the chain between runs
+    # Like a loop of add, an item is only inserted once: items already in the chain and
+    #   repeats within the batch are dropped before the capacity split. Repeats are found by
+    #   their hash pair, which also covers unhashable keys like bytearray, and items with the
+    #   same pair set the same bits anyway
+    def add_many(self, items, batch_size=65536):
+        for batch in batches(items, batch_size):
+            new_items = as_sequence(batch)
+            _, first = np.unique(hash_pairs(new_items), axis=0, return_index=True)
+            keep = np.zeros(len(new_items), dtype=bool)
+            keep[first] = True
+            keep &= ~self.contains_many(new_items)
+            if isinstance(new_items, list):
+                new_items = [item for item, new in zip(new_items, keep) if new]
+            else:
+                new_items = new_items[keep]
+            while len(new_items):
+                if self.current_count >= self.capacities[-1]:
+                    self.add_filter()
+                room = self.capacities[-1] - self.current_count
+                run, new_items = new_items[:room], new_items[room:]
+                self.filters[-1].add_many(run)
+                self.current_count += len(run)
+                self.count += len(run)
+
+    def contains_many(self, items):
+        items = as_sequence(items)
+        found = np.zeros(len(items), dtype=bool)
+        for bloom_filter in self.filters:
+            found |= bloom_filter.contains_many(items)
+        return found
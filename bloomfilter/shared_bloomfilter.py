@@ -0,0 +1,134 @@
+from bloomfilter import BloomFilter, FILE_HEADER, BATCH_SIZE, batches, read_header
+from bitarray import bitarray
+from multiprocessing import shared_memory
+import multiprocessing
+import math
+
+# A Bloom filter whose bit array lives in a multiprocessing.shared_memory block, so several
+#   processes can add to one logical filter and readers see new bits immediately
+# The block uses the same layout as a saved filter (header followed by the raw bits), so
+#   other processes attach with just the block's name
+# Setting a bit is idempotent, but it is still a read-modify-write of the whole byte:
+#   two processes setting different bits of the same byte at the same time can lose one of
+#   them, which would be a false negative. Writers therefore share a lock, but only hold it
+#   while OR-ing a batch's precomputed indexes into the array. Hashing, which is nearly all
+#   of the work, runs in parallel outside the lock. Readers never take the lock
+
+
+class SharedBloomFilter(BloomFilter):
+    def __init__(self, false_pos_prob, num_items, lock=None):
+        self.filter_size = math.ceil(
+            self.calculate_filter_size(false_pos_prob, num_items)
+        )
+        self.num_hashes = math.ceil(self.calculate_number_hashes(false_pos_prob))
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+
+        size = FILE_HEADER.size + math.ceil(self.filter_size / 8)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.shm.buf[: FILE_HEADER.size] = self.header()
+        self.shm.buf[FILE_HEADER.size : size] = bytes(size - FILE_HEADER.size)
+        self.bit_array = self.shared_bits()
+
+    # The bits as a bitarray backed directly by the shared memory block
+    def shared_bits(self, readonly=False):
+        size = FILE_HEADER.size + math.ceil(self.filter_size / 8)
+        buffer = self.shm.buf[FILE_HEADER.size : size]
+        if readonly:
+            buffer = buffer.toreadonly()
+        return bitarray(buffer=buffer, endian="big")
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # Attach to a filter created in another process
+    # Processes that add must pass the creator's lock, it can only be handed over when the
+    #   process is started (e.g. through Process args or a Pool initializer). Without a
+    #   lock the filter is attached read-only, since a private lock would not keep writers
+    #   from losing each other's bits
+    # The attaching process does not register the block with its resource tracker, so only
+    #   the creator decides when the block is unlinked
+    @classmethod
+    def attach(cls, name, lock=None):
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.shm = shared_memory.SharedMemory(name=name, track=False)
+        bloom_filter.filter_size, bloom_filter.num_hashes = read_header(
+            bloom_filter.shm.buf, name, exact_size=False
+        )
+        bloom_filter.lock = lock
+        bloom_filter.bit_array = bloom_filter.shared_bits(readonly=lock is None)
+        return bloom_filter
+
+    # Pickling a shared filter (e.g. as a Pool initializer argument) attaches to the same
+    #   block in the receiving process instead of copying the bits
+    def __reduce__(self):
+        return (type(self).attach, (self.name, self.lock))
+
+    # The writers' lock, a filter attached without one is read-only
+    def writer_lock(self):
+        if self.lock is None:
+            raise TypeError("filter was attached read-only, pass the creator's lock")
+        return self.lock
+
+    def add(self, item):
+        with self.writer_lock():
+            super().add(item)
+
+    def set_bits(self, indexes):
+        with self.writer_lock():
+            super().set_bits(indexes)
+
+    def __ior__(self, other):
+        with self.writer_lock():
+            return super().__ior__(other)
+
+    def __iand__(self, other):
+        with self.writer_lock():
+            return super().__iand__(other)
+
+    # Release this process's view of the block. The bit array has to go first because it
+    #   holds a pointer into the shared memory. Closing twice is harmless
+    def close(self):
+        self.__dict__.pop("bit_array", None)
+        self.shm.close()
+
+    # Attached filters in child processes are rarely closed explicitly. Without this, the
+    #   filter's attributes are cleared in order on exit and SharedMemory.__del__ runs while
+    #   the bit array still points into the block, which prints a BufferError
+    def __del__(self):
+        if "shm" in self.__dict__:
+            self.close()
+
+    # Free the block once every process is done with it, called by the creator
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+# Per process filter for the pool workers in build_parallel
+worker_filter = None
+
+
+def init_worker(bloom_filter):
+    global worker_filter
+    worker_filter = bloom_filter
+
+
+def add_batch(batch):
+    worker_filter.add_many(batch)
+    return len(batch)
+
+
+# Build a shared filter from a large iterable with a process pool
+# Items are sent to the workers in batches, each worker hashes its batch and sets the bits
+#   directly in the shared block. The caller owns the result and must unlink it when done
+def build_parallel(
+    items, false_pos_prob, num_items, num_processes=None, batch_size=BATCH_SIZE
+):
+    bloom_filter = SharedBloomFilter(false_pos_prob, num_items)
+    with multiprocessing.Pool(
+        processes=num_processes, initializer=init_worker, initargs=(bloom_filter,)
+    ) as pool:
+        for _ in pool.imap_unordered(add_batch, batches(items, batch_size)):
+            pass
+    return bloom_filter
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The bloomfilter modules import each other as top level modules, e.g. "from bloomfilter
+#   import ...", so the tests run with the project directory on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,124 @@
+from bloomfilter import BloomFilter, batch_indexes, hash_pair, hash_pairs
+from blocked_bloomfilter import BlockedBloomFilter
+import numpy as np
+import pytest
+
+# Every kind of key the filters accept, including negative and 64 bit integers
+KEYS = [
+    "apple",
+    "",
+    "ünïcode",
+    b"bytes",
+    bytearray(b"bytearray"),
+    memoryview(b"a memoryview")[2:],
+    0,
+    5,
+    -1,
+    2**64 - 1,
+    np.int64(-7),
+    np.uint64(2**63),
+]
+INTS = np.array([0, 1, -1, 42, -(2**63), 2**63 - 1], dtype=np.int64)
+
+
+def test_hash_pairs_match_hash_pair():
+    expected = [hash_pair(key) for key in KEYS]
+    assert hash_pairs(KEYS).tolist() == [list(pair) for pair in expected]
+    # The vectorized integer path hashes like Python ints modulo 2^64
+    assert hash_pairs(INTS).tolist() == hash_pairs(INTS.tolist()).tolist()
+    assert hash_pair(5) != hash_pair("5")
+
+
+def test_batch_indexes_match_scalar():
+    bloom_filter = BloomFilter(0.01, 1000)
+    indexes = batch_indexes(
+        hash_pairs(KEYS), bloom_filter.num_hashes, bloom_filter.filter_size
+    )
+    assert indexes.tolist() == [list(bloom_filter.indexes(key)) for key in KEYS]
+
+
+@pytest.mark.parametrize("filter_class", [BloomFilter, BlockedBloomFilter])
+def test_add_many_matches_add(filter_class):
+    items = [f"item {i}" for i in range(2000)] + KEYS
+    one_by_one = filter_class(0.01, 2000)
+    for item in items:
+        one_by_one.add(item)
+    batched = filter_class(0.01, 2000)
+    batched.add_many(items)
+
+    if filter_class is BloomFilter:
+        assert batched.bit_array == one_by_one.bit_array
+    else:
+        assert np.array_equal(batched.blocks, one_by_one.blocks)
+
+    queries = items + [f"other {i}" for i in range(2000)]
+    expected = [one_by_one.contains(item) for item in queries]
+    assert batched.contains_many(queries).tolist() == expected
+    assert all(expected[: len(items)])
+
+
+@pytest.mark.parametrize("filter_class", [BloomFilter, BlockedBloomFilter])
+def test_false_positive_rate(filter_class):
+    bloom_filter = filter_class(0.01, 20000)
+    bloom_filter.add_many(np.arange(20000))
+    assert bloom_filter.contains_many(np.arange(20000)).all()
+    assert bloom_filter.contains_many(np.arange(20000, 120000)).mean() < 0.02
+
+
+def test_union_and_intersection():
+    left, right, both = (BloomFilter(0.01, 1000) for _ in range(3))
+    left.add_many(range(0, 600))
+    right.add_many(range(400, 1000))
+    both.add_many(range(0, 1000))
+    assert (left | right).bit_array == both.bit_array
+    assert (left & right).contains_many(range(400, 600)).all()
+
+    left |= right
+    assert left.bit_array == both.bit_array
+    with pytest.raises(ValueError):
+        left | BloomFilter(0.001, 1000)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_open_round_trip(tmp_path, mmap):
+    bloom_filter = BloomFilter(0.01, 1000)
+    bloom_filter.add_many(range(1000))
+    path = tmp_path / "filter.bloom"
+    bloom_filter.save(path)
+
+    opened = BloomFilter.open(path, mmap=mmap)
+    assert (opened.filter_size, opened.num_hashes) == (
+        bloom_filter.filter_size,
+        bloom_filter.num_hashes,
+    )
+    queries = range(5000)
+    assert np.array_equal(
+        opened.contains_many(queries), bloom_filter.contains_many(queries)
+    )
+    assert [opened.contains(i) for i in queries] == [
+        bloom_filter.contains(i) for i in queries
+    ]
+
+    if mmap:
+        with pytest.raises(TypeError):
+            opened.add_many(["new"])
+    else:
+        opened.add_many(["new"])
+        assert opened.contains("new")
+
+
+def test_open_rejects_bad_files(tmp_path):
+    bloom_filter = BloomFilter(0.01, 1000)
+    path = tmp_path / "filter.bloom"
+    bloom_filter.save(path)
+    data = path.read_bytes()
+
+    for name, corrupt in [
+        ("magic", b"XXXX" + data[4:]),
+        ("truncated", data[:-1]),
+        ("trailing", data + b"\0"),
+        ("header", data[:10]),
+    ]:
+        (tmp_path / name).write_bytes(corrupt)
+        with pytest.raises(ValueError):
+            BloomFilter.open(tmp_path / name)
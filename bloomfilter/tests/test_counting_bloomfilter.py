@@ -0,0 +1,87 @@
+from counting_bloomfilter import (
+    CountingBloomFilter,
+    WindowedCountingBloomFilter,
+    get_counter,
+    set_counter,
+    COUNTER_MAX,
+)
+import numpy as np
+
+
+def all_counters(counting_filter):
+    return [
+        get_counter(counting_filter.counters, index)
+        for index in range(counting_filter.filter_size)
+    ]
+
+
+# Two counters share a byte, writing one must leave its neighbour alone
+def test_packed_counters_are_independent():
+    counters = np.zeros(8, dtype=np.uint8)
+    values = [(7 * index + 3) % (COUNTER_MAX + 1) for index in range(16)]
+    for index, value in enumerate(values):
+        set_counter(counters, index, value)
+    assert [get_counter(counters, index) for index in range(16)] == values
+
+    set_counter(counters, 5, 0)
+    values[5] = 0
+    assert [get_counter(counters, index) for index in range(16)] == values
+
+
+# A small filter so indexes collide and counters saturate
+def test_add_many_matches_add():
+    items = [f"item {i % 300}" for i in range(1000)]
+    one_by_one = CountingBloomFilter(0.1, 50)
+    for item in items:
+        one_by_one.add(item)
+    batched = CountingBloomFilter(0.1, 50)
+    batched.add_many(items)
+
+    counters = all_counters(one_by_one)
+    assert all_counters(batched) == counters
+    assert COUNTER_MAX in counters
+    assert batched.contains_many(items).all()
+
+
+# Every increment is undone by the matching decrement as long as nothing saturates
+def test_remove_restores_counters():
+    items = [f"item {i}" for i in range(2000)]
+    one_by_one = CountingBloomFilter(0.01, 2000)
+    batched = CountingBloomFilter(0.01, 2000)
+    one_by_one.add_many(items)
+    batched.add_many(items)
+    assert max(all_counters(batched)) < COUNTER_MAX
+
+    for item in items[:1000]:
+        assert one_by_one.remove(item)
+    assert batched.remove_many(items[:1000]).all()
+    assert all_counters(batched) == all_counters(one_by_one)
+    assert batched.contains_many(items[1000:]).all()
+
+    batched.remove_many(items[1000:])
+    assert not any(all_counters(batched))
+
+
+def test_saturated_counters_stay():
+    counting_filter = CountingBloomFilter(0.01, 100)
+    for _ in range(COUNTER_MAX + 5):
+        counting_filter.add("item")
+    for _ in range(COUNTER_MAX + 5):
+        counting_filter.remove("item")
+    assert counting_filter.contains("item")
+    assert not counting_filter.remove("never added")
+
+
+def test_windowed_filter_forgets_old_items():
+    now = [0.0]
+    windowed = WindowedCountingBloomFilter(
+        0.01, 100, window=4, generations=4, clock=lambda: now[0]
+    )
+    windowed.add("old")
+    now[0] = 2.5
+    windowed.add_many(["new"])
+    assert windowed.contains_many(["old", "new"]).all()
+
+    now[0] = 4.5
+    assert not windowed.contains("old")
+    assert windowed.contains("new")
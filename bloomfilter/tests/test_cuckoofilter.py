@@ -0,0 +1,98 @@
+from cuckoofilter import CuckooFilter, FILE_HEADER
+from bloomfilter import BloomFilter
+import numpy as np
+import pytest
+
+
+# 13 bit fingerprints in 4 slot buckets, so slots straddle word boundaries
+def test_packed_slots():
+    cuckoo_filter = CuckooFilter(0.001, 1000)
+    assert cuckoo_filter.fingerprint_bits == 13
+    mask = (1 << 13) - 1
+    values = {}
+    for index in range(cuckoo_filter.num_buckets):
+        for slot in range(cuckoo_filter.bucket_size):
+            values[index, slot] = (index * 977 + slot * 131 + 1) & mask
+            cuckoo_filter.write_slot(index, slot, values[index, slot])
+
+    for index in range(cuckoo_filter.num_buckets):
+        expected = [values[index, slot] for slot in range(cuckoo_filter.bucket_size)]
+        assert cuckoo_filter.bucket(index) == expected
+    indexes = range(cuckoo_filter.num_buckets)
+    slots = cuckoo_filter.read_slots(cuckoo_filter.slot_offsets(list(indexes)))
+    assert slots.tolist() == [cuckoo_filter.bucket(index) for index in indexes]
+
+
+# The alternate bucket must lead back for any number of buckets
+def test_alt_index_is_an_involution():
+    cuckoo_filter = CuckooFilter(0.001, 1000)
+    assert cuckoo_filter.num_buckets & (cuckoo_filter.num_buckets - 1)
+    for index in range(cuckoo_filter.num_buckets):
+        for fingerprint in (1, 77, 8191):
+            other = cuckoo_filter.alt_index(index, fingerprint)
+            assert 0 <= other < cuckoo_filter.num_buckets
+            assert cuckoo_filter.alt_index(other, fingerprint) == index
+
+    first, second, fingerprints = cuckoo_filter.batch_locate(list(range(1000)))
+    for item, index, other, fingerprint in zip(
+        range(1000), first, second, fingerprints
+    ):
+        assert cuckoo_filter.locate(item) == (index, fingerprint)
+        assert cuckoo_filter.alt_index(int(index), int(fingerprint)) == other
+
+
+def test_full_load_has_no_false_negatives():
+    items = np.arange(20000)
+    cuckoo_filter = CuckooFilter(0.001, len(items))
+    assert cuckoo_filter.add_many(items).all()
+    assert cuckoo_filter.load_factor() > 0.9
+    assert cuckoo_filter.contains_many(items).all()
+
+    queries = np.arange(20000, 120000)
+    found = cuckoo_filter.contains_many(queries)
+    assert found.mean() < 0.002
+    assert found[:2000].tolist() == [
+        cuckoo_filter.contains(int(i)) for i in queries[:2000]
+    ]
+
+
+@pytest.mark.parametrize("false_pos_prob", [0.001, 0.0001])
+def test_smaller_than_bloom_filter(false_pos_prob):
+    num_items = 100000
+    cuckoo_filter = CuckooFilter(false_pos_prob, num_items)
+    bloom_filter = BloomFilter(false_pos_prob, num_items)
+    assert 8 * cuckoo_filter.memory_bytes < bloom_filter.filter_size
+
+
+def test_remove():
+    items = [f"item {i}" for i in range(1000)]
+    cuckoo_filter = CuckooFilter(0.001, 1000)
+    cuckoo_filter.add_many(items)
+    assert all(cuckoo_filter.remove(item) for item in items[:500])
+    assert cuckoo_filter.remove_many(items[500:700]).all()
+    assert len(cuckoo_filter) == 300
+    assert cuckoo_filter.contains_many(items[700:]).all()
+    assert cuckoo_filter.contains_many(items[:700]).sum() < 10
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_open_round_trip(tmp_path, mmap):
+    items = [f"item {i}" for i in range(1000)]
+    cuckoo_filter = CuckooFilter(0.001, 1000)
+    cuckoo_filter.add_many(items)
+    path = tmp_path / "filter.cuckoo"
+    cuckoo_filter.save(path)
+
+    opened = CuckooFilter.open(path, mmap=mmap)
+    assert len(opened) == len(cuckoo_filter)
+    queries = items + [f"other {i}" for i in range(5000)]
+    assert np.array_equal(
+        opened.contains_many(queries), cuckoo_filter.contains_many(queries)
+    )
+    if not mmap:
+        opened.add("new")
+        assert opened.contains("new")
+
+    path.write_bytes(path.read_bytes()[: FILE_HEADER.size + 8])
+    with pytest.raises(ValueError):
+        CuckooFilter.open(path)
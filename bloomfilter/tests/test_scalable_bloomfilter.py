@@ -0,0 +1,46 @@
+from scalable_bloomfilter import ScalableBloomFilter
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        ["x"] * 1000,
+        np.full(1000, 7),
+        [bytearray(b"key")] * 10 + [b"other"],
+    ],
+    ids=["str", "array", "bytearray"],
+)
+def test_add_many_matches_add(items):
+    one_by_one = ScalableBloomFilter(0.01, 100)
+    for item in items:
+        one_by_one.add(item)
+    batched = ScalableBloomFilter(0.01, 100)
+    batched.add_many(items)
+
+    assert len(batched) == len(one_by_one)
+    assert len(batched.filters) == len(one_by_one.filters)
+    assert batched.contains_many(items).all()
+
+
+# A loop of add can also skip an item that is a false positive of the items before it,
+#   so with many distinct items only the exact count is compared
+def test_add_many_counts_distinct_items():
+    items = [f"item {i % 250}" for i in range(1000)]
+    scalable = ScalableBloomFilter(0.01, 100)
+    scalable.add_many(items)
+    assert len(scalable) == 250
+    assert len(scalable.filters) == 2
+
+    scalable.add_many(items, batch_size=100)
+    assert len(scalable) == 250
+
+
+def test_growth_keeps_error_bound():
+    scalable = ScalableBloomFilter(0.01, 1000)
+    scalable.add_many(np.arange(20000))
+    assert len(scalable.filters) > 1
+    assert scalable.capacity >= len(scalable)
+    assert scalable.contains_many(np.arange(20000)).all()
+    assert scalable.contains_many(np.arange(20000, 120000)).mean() < 0.01
@@ -0,0 +1,30 @@
+from shared_bloomfilter import SharedBloomFilter, build_parallel
+import pytest
+
+
+def test_build_parallel():
+    items = [f"item {i}" for i in range(50000)]
+    bloom_filter = build_parallel(items, 0.01, len(items), num_processes=2)
+    try:
+        assert bloom_filter.contains_many(items).all()
+    finally:
+        bloom_filter.unlink()
+
+
+# Attaching sees the creator's bits, without the lock it is read-only
+def test_attach():
+    bloom_filter = SharedBloomFilter(0.01, 1000)
+    try:
+        bloom_filter.add_many(["a", "b"])
+        reader = SharedBloomFilter.attach(bloom_filter.name)
+        assert reader.contains_many(["a", "b"]).all()
+        with pytest.raises(TypeError):
+            reader.add("c")
+
+        writer = SharedBloomFilter.attach(bloom_filter.name, bloom_filter.lock)
+        writer.add("c")
+        assert bloom_filter.contains("c") and reader.contains("c")
+        reader.close()
+        writer.close()
+    finally:
+        bloom_filter.unlink()
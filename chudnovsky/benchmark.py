@@ -0,0 +1,297 @@
+from decimal import Decimal, getcontext
+from datetime import datetime, timezone
+from time import perf_counter
+from common import terms_for_precision, to_decimal_string, GUARD_DIGITS
+from common import mpz, isqrt, BACKEND
+from hypergeometric import parallel_binary_split, split_series
+from functools import partial
+import chudnovsky_unoptimized
+import chudnovsky_optimized
+import multiprocessing
+import statistics
+import argparse
+import platform
+import resource
+import queue
+import math
+import json
+import csv
+import sys
+
+# Benchmark runner for the Chudnovsky engines
+# Every engine is run at every digit count, a number of times, each run in a freshly
+#   spawned process. That gives every run the same clean interpreter, lets a run be
+#   killed when it exceeds the timeout, and makes the process's peak resident memory
+#   (ru_maxrss) the peak of that run alone
+# Runs are timed per phase: summing the series, the square root of 10005, the final
+#   division and the conversion to a decimal string (for the unoptimized series the
+#   square root is sqrt(640320), its constant factor)
+# Once an engine times out at some digit count, larger counts are skipped for it
+# Results are JSON (or CSV with one row per run) together with a fitted scaling exponent
+#   per engine, the slope of log(time) over log(digits)
+PHASES = ["series", "sqrt", "division", "string"]
+CSV_FIELDS = [
+    "engine",
+    "digits",
+    "terms",
+    "repetition",
+    "status",
+    *(f"{phase}_seconds" for phase in PHASES),
+    "total_seconds",
+    "peak_rss_bytes",
+    "baseline_rss_bytes",
+]
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+# Each engine computes pi to `precision` digits and returns the seconds per phase
+def run_unoptimized(precision, workers):
+    getcontext().prec = precision + GUARD_DIGITS
+    terms = terms_for_precision(precision)
+    times = {}
+
+    start = perf_counter()
+    series = chudnovsky_unoptimized.ChudnovskySeries()
+    series.extend(terms)
+    times["series"] = perf_counter() - start
+
+    C3 = chudnovsky_unoptimized.C3
+    start = perf_counter()
+    C3_sqrt = C3.sqrt()
+    times["sqrt"] = perf_counter() - start
+
+    start = perf_counter()
+    pi = C3 * C3_sqrt / (Decimal(12) * series.partial_sum)
+    times["division"] = perf_counter() - start
+
+    start = perf_counter()
+    str(pi)
+    times["string"] = perf_counter() - start
+    return times
+
+
+def run_binary_splitting(precision, workers):
+    getcontext().prec = precision + GUARD_DIGITS
+    terms = terms_for_precision(precision)
+    times = {}
+
+    start = perf_counter()
+    P1n, Q1n, R1n = parallel_binary_split(
+        chudnovsky_optimized.binary_split, 1, terms, workers
+    )
+    times["series"] = perf_counter() - start
+
+    start = perf_counter()
+    C1 = Decimal(426880) * Decimal(10005).sqrt()
+    times["sqrt"] = perf_counter() - start
+
+    start = perf_counter()
+    pi = (C1 * Q1n) / (chudnovsky_optimized.C2 * Q1n + R1n)
+    times["division"] = perf_counter() - start
+
+    start = perf_counter()
+    str(pi)
+    times["string"] = perf_counter() - start
+    return times
+
+
+# The phases of hypergeometric.pi_from_split, timed one by one
+def run_integer(precision, workers):
+    terms = terms_for_precision(precision)
+    times = {}
+
+    start = perf_counter()
+    P1n, Q1n, R1n = parallel_binary_split(
+        partial(split_series, "chudnovsky"), 1, terms, workers
+    )
+    times["series"] = perf_counter() - start
+
+    start = perf_counter()
+    scale = mpz(10) ** (precision + GUARD_DIGITS)
+    sqrt_10005 = isqrt(10005 * scale * scale)
+    times["sqrt"] = perf_counter() - start
+
+    start = perf_counter()
+    pi = (426880 * sqrt_10005 * Q1n) // (13591409 * Q1n + R1n)
+    pi //= mpz(10) ** GUARD_DIGITS
+    times["division"] = perf_counter() - start
+
+    start = perf_counter()
+    to_decimal_string(pi)
+    times["string"] = perf_counter() - start
+    return times
+
+
+# The serial engines ignore workers
+ENGINES = {
+    "unoptimized": (run_unoptimized, False),
+    "binary_splitting": (run_binary_splitting, False),
+    "integer": (run_integer, False),
+    "integer_parallel": (run_integer, True),
+}
+
+
+# For the parallel engines this is the larger of the run's own peak and the largest peak
+#   of its pool workers
+def peak_rss():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, workers) * RSS_UNIT
+
+
+# Runs in the spawned process
+def run_child(results, engine, precision, workers):
+    function, parallel = ENGINES[engine]
+    baseline = peak_rss()
+    times = function(precision, workers if parallel else 1)
+    results.put((times, peak_rss(), baseline))
+
+
+def run_case(context, engine, precision, workers, timeout):
+    results = context.Queue()
+    process = context.Process(
+        target=run_child, args=(results, engine, precision, workers)
+    )
+    process.start()
+    try:
+        times, peak, baseline = results.get(timeout=timeout)
+        status = "ok"
+    except queue.Empty:
+        times, peak, baseline = {}, None, None
+        status = "timeout" if process.is_alive() else "failed"
+    process.terminate()
+    process.join()
+
+    row = {
+        "engine": engine,
+        "digits": precision,
+        "terms": terms_for_precision(precision),
+        "status": status,
+        **{f"{phase}_seconds": times.get(phase) for phase in PHASES},
+        "total_seconds": sum(times.values()) if times else None,
+        "peak_rss_bytes": peak,
+        "baseline_rss_bytes": baseline,
+    }
+    return row
+
+
+def run_benchmarks(sizes, engines, repetitions=3, timeout=60, workers=None):
+    context = multiprocessing.get_context("spawn")
+    workers = workers or multiprocessing.cpu_count()
+    results = []
+    for engine in engines:
+        for precision in sorted(sizes):
+            rows = []
+            for repetition in range(repetitions):
+                row = run_case(context, engine, precision, workers, timeout)
+                row["repetition"] = repetition
+                rows.append(row)
+                if row["status"] != "ok":
+                    break
+            results.extend(rows)
+
+            last = rows[-1]
+            if last["status"] != "ok":
+                print(f"{engine:>16} {precision:>10} {last['status']}", file=sys.stderr)
+                break
+            print(
+                f"{engine:>16} {precision:>10}"
+                f" total {statistics.median(r['total_seconds'] for r in rows):>10.3f}s"
+                f" peak {last['peak_rss_bytes'] / 2**20:>8.1f} MiB",
+                file=sys.stderr,
+            )
+    return results
+
+
+# Slope of log(median total time) over log(digits) per engine, by least squares
+# Sizes that take under a millisecond are dominated by overhead and left out
+def scaling_exponents(results):
+    exponents = {}
+    for engine in dict.fromkeys(row["engine"] for row in results):
+        medians = {}
+        for row in results:
+            if row["engine"] == engine and row["status"] == "ok":
+                medians.setdefault(row["digits"], []).append(row["total_seconds"])
+        points = [
+            (math.log(digits), math.log(statistics.median(times)))
+            for digits, times in medians.items()
+            if statistics.median(times) > 1e-3
+        ]
+        if len(points) < 2:
+            exponents[engine] = None
+            continue
+        mean_x = statistics.fmean(x for x, _ in points)
+        mean_y = statistics.fmean(y for _, y in points)
+        exponents[engine] = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum(
+            (x - mean_x) ** 2 for x, _ in points
+        )
+    return exponents
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Chudnovsky engines")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10**3, 10**4, 10**5, 10**6, 10**7],
+        help="digit counts",
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="seconds per run before it is killed and larger sizes are skipped",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="processes for the parallel engines (default: all)"
+    )
+    parser.add_argument("--label", help="free form tag, e.g. a version or commit")
+    parser.add_argument("--output", help="write JSON here instead of to stdout")
+    parser.add_argument("--csv", help="also write one CSV row per run here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(
+        args.sizes,
+        args.engines,
+        repetitions=args.repetitions,
+        timeout=args.timeout,
+        workers=args.workers,
+    )
+    report = {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend": BACKEND,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "scaling_exponents": scaling_exponents(results),
+        "results": results,
+    }
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
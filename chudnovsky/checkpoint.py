@@ -0,0 +1,158 @@
+from common import mpz
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import struct
+import os
+
+# Checkpointing for long binary splitting computations, e.g. pi
+# The term range is split into chunks and the (P, Q, R) triple of every finished chunk is
+#   written to its own file in the checkpoint directory, named after its range [a, b)
+# Chunks follow a fixed grid of CHUNK_TERMS terms, so a run that was killed or a run for
+#   more digits finds the same chunks on disk and only computes the missing ones
+# After merging, the triple for the whole range is saved as well. Raising the target
+#   precision later then reuses it as a single chunk: only the new term range is computed,
+#   and one merge with the old result gives the triple for the larger range
+CHUNK_TERMS = 10000
+
+# File format: magic, a, b, then P, Q and R each as a sign byte, a byte length and the
+#   magnitude as little endian bytes
+CHUNK_MAGIC = b"PQR1"
+CHUNK_HEADER = struct.Struct("<4sQQ")
+INT_HEADER = struct.Struct("<bQ")
+
+
+def chunk_path(directory, a, b):
+    return Path(directory) / f"{a:012d}-{b:012d}.pqr"
+
+
+def write_int(f, n):
+    n = int(n)
+    magnitude = abs(n)
+    data = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, "little")
+    f.write(INT_HEADER.pack((n > 0) - (n < 0), len(data)))
+    f.write(data)
+
+
+def read_int(f):
+    sign, length = INT_HEADER.unpack(f.read(INT_HEADER.size))
+    return sign * mpz(int.from_bytes(f.read(length), "little"))
+
+
+# Written to a temporary file and renamed, so a killed process never leaves a partial chunk
+def save_triple(directory, a, b, triple):
+    path = chunk_path(directory, a, b)
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "wb") as f:
+        f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, a, b))
+        for n in triple:
+            write_int(f, n)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_triple(directory, a, b):
+    with open(chunk_path(directory, a, b), "rb") as f:
+        magic, start, end = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+        if magic != CHUNK_MAGIC or (start, end) != (a, b):
+            raise ValueError(f"{f.name} is not a checkpoint for [{a}, {b})")
+        return tuple(read_int(f) for _ in range(3))
+
+
+# Ranges [a, b) with a saved triple, by start
+def saved_ranges(directory):
+    ranges = {}
+    for path in Path(directory).glob("*.pqr"):
+        a, b = (int(part) for part in path.stem.split("-"))
+        ranges.setdefault(a, []).append(b)
+    return ranges
+
+
+# Cover [a, b) with saved ranges where possible and new grid aligned chunks elsewhere
+# At every position the longest saved range that fits is used, which picks up the result
+#   of a previous, shorter run as a whole. Returns (start, end, saved) tuples in order
+def plan_chunks(a, b, directory, chunk_terms=CHUNK_TERMS):
+    saved = saved_ranges(directory)
+    plan = []
+    position = a
+    while position < b:
+        ends = [end for end in saved.get(position, []) if end <= b]
+        if ends:
+            end = max(ends)
+            plan.append((position, end, True))
+        else:
+            end = min(b, (position // chunk_terms + 1) * chunk_terms)
+            plan.append((position, end, False))
+        position = end
+    return plan
+
+
+def compute_chunk(split, a, b, directory):
+    save_triple(directory, a, b, split(a, b))
+
+
+# Merge adjacent triples pairwise, the same combination binary_split uses
+def merge_triples(triples):
+    while len(triples) > 1:
+        merged = []
+        for (Pam, Qam, Ram), (Pmb, Qmb, Rmb) in zip(triples[0::2], triples[1::2]):
+            merged.append((Pam * Pmb, Qam * Qmb, Qmb * Ram + Pam * Rmb))
+        if len(triples) % 2:
+            merged.append(triples[-1])
+        triples = merged
+    return triples[0]
+
+
+# Binary splitting of [a, b) that persists every chunk and resumes from whatever is on disk
+# Missing chunks are computed in a process pool when workers > 1
+# split is the leaf-range function like in parallel_binary_split. Triples of different
+#   series must not share a directory
+def checkpointed_binary_split(
+    split, a, b, directory, workers=1, chunk_terms=CHUNK_TERMS
+):
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    plan = plan_chunks(a, b, directory, chunk_terms)
+    missing = [(start, end) for start, end, saved in plan if not saved]
+
+    if workers > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            starts, ends = zip(*missing)
+            repeat = len(missing)
+            list(
+                pool.map(
+                    compute_chunk, [split] * repeat, starts, ends, [directory] * repeat
+                )
+            )
+    else:
+        for start, end in missing:
+            compute_chunk(split, start, end, directory)
+
+    triple = merge_triples(
+        [load_triple(directory, start, end) for start, end, _ in plan]
+    )
+    if len(plan) > 1:
+        save_triple(directory, a, b, triple)
+    return triple
+
+
+if __name__ == "__main__":
+    from chudnovsky_integer import pi_fixed_point
+    from common import terms_for_precision
+
+    parser = argparse.ArgumentParser(
+        description="Compute pi with resumable, checkpointed binary splitting"
+    )
+    parser.add_argument("digits", type=int)
+    parser.add_argument("directory", help="checkpoint directory, reused across runs")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    # pi_fixed_point keeps the Chudnovsky chunks in a subdirectory, see hypergeometric.py
+    terms = terms_for_precision(args.digits)
+    plan = plan_chunks(1, terms, Path(args.directory) / "chudnovsky")
+    reused = sum(end - start for start, end, saved in plan if saved)
+    print(f"{terms} terms, {reused} already checkpointed")
+
+    pi, terms = pi_fixed_point(args.digits, args.workers, args.directory)
+    print(f"Computed {args.digits} digits of Pi in {terms} terms")
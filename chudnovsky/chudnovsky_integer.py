@@ -0,0 +1,21 @@
+from hypergeometric import compute
+from common import guaranteed_digits, to_decimal_string, BACKEND
+
+
+# Pi as a fixed-point integer, floor(pi * 10^precision), computed without Decimal
+# This is the registered "chudnovsky" series of hypergeometric.py, split with mpz when
+#   gmpy2 is installed (BACKEND). workers > 1 runs the binary splitting in a process pool,
+#   with a directory the chunks are checkpointed there and reused, see checkpoint.py
+def pi_fixed_point(precision, workers=1, directory=None):
+    return compute("chudnovsky", precision, workers, directory)
+
+
+# Digits of pi as a string "3.1415...", with the same return values as the other engines
+def chudnovsky_single_pass(precision, workers=1):
+    pi, terms = pi_fixed_point(precision, workers)
+    digits = to_decimal_string(pi)
+    return f"{digits[0]}.{digits[1:]}", terms, guaranteed_digits(terms, precision)
+
+
+if __name__ == "__main__":
+    pass
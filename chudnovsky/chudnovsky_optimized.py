@@ -1,34 +1,27 @@
 from decimal import Decimal, getcontext
+from hypergeometric import parallel_binary_split, split_series
+from functools import partial
 from time import time
 import sys
-from common import find_diff_index
-
+from common import (
+    agreeing_digits,
+    terms_for_precision,
+    guaranteed_digits,
+    GUARD_DIGITS,
+)
 
 # C1 = Decimal(426880) * Decimal(10005).sqrt()
 C2 = Decimal(13591409)
 
 
-def binary_split(a, b):
-    # Base case
-    if b == a + 1:
-        Pab = (-1) * (6 * a - 1) * (2 * a - 1) * (6 * a - 5)
-        Qab = 10939058860032000 * a**3
-        Rab = Pab * (545140134 * a + 13591409)
-    else:
-        m = (a + b) // 2
-        Pam, Qam, Ram = binary_split(a, m)
-        Pmb, Qmb, Rmb = binary_split(m, b)
-
-        Pab = Pam * Pmb
-        Qab = Qam * Qmb
-        Rab = Qmb * Ram + Pam * Rmb
-
-    return Pab, Qab, Rab
+# The Chudnovsky series of hypergeometric.py with Python int leaves, so the products stay
+#   plain ints that Decimal accepts
+binary_split = partial(split_series, "chudnovsky", integer=int)
 
 
 # Function to compute pi using the Chudnovsky series optimized with binary splitting.
-def chudnovsky_term(num_terms):
-    P1n, Q1n, R1n = binary_split(1, num_terms)
+def chudnovsky_term(num_terms, workers=1):
+    P1n, Q1n, R1n = parallel_binary_split(binary_split, 1, num_terms, workers)
     return (C1 * Q1n) / (C2 * Q1n + R1n)
 
 
@@ -44,7 +37,7 @@ def chudnovsky_precision(precision):
 
     while True:
         curr = chudnovsky_term(terms)
-        diff_idx = find_diff_index(prev, curr)
+        diff_idx = agreeing_digits(prev, curr)
         if diff_idx > precision:
             return curr, terms, diff_idx
 
@@ -52,5 +45,19 @@ def chudnovsky_precision(precision):
         terms += 1
 
 
+# Single pass: the number of terms follows from the precision, so the series is split
+#   once and divided once instead of being recomputed for 2, 3, 4, ... terms
+# workers > 1 runs the binary splitting in a process pool, see parallel_binary_split
+def chudnovsky_single_pass(precision, workers=1):
+    getcontext().prec = precision + GUARD_DIGITS
+
+    global C1
+    C1 = Decimal(426880) * Decimal(10005).sqrt()
+
+    terms = terms_for_precision(precision)
+    pi = chudnovsky_term(terms, workers)
+    return pi, terms, guaranteed_digits(terms, precision)
+
+
 if __name__ == "__main__":
     pass
@@ -2,12 +2,18 @@ from decimal import Decimal, getcontext
 import math
 import sys
 from time import time, sleep
-from common import find_diff_index
+from common import (
+    agreeing_digits,
+    terms_for_precision,
+    guaranteed_digits,
+    GUARD_DIGITS,
+)
 
 # Constants
 C1 = Decimal(545140134)
 C2 = Decimal(13591409)
 C3 = Decimal(640320)
+C3_CUBED = 640320**3
 
 
 # Function to compute the k-th term of the Chudnovsky series
@@ -25,24 +31,62 @@ def chudnovsky(k):
     return Decimal((-1) ** k) * (numerator / denominator)
 
 
+# The same series summed incrementally, with a running partial sum that can be extended
+#   one term at a time
+# Without the factor (C1 * k + C2) and the constant C3^(3/2), the k-th term is
+#   a_k = (-1)^k (6k)! / ((3k)! (k!)^3 C3^(3k))
+# and dividing consecutive terms cancels almost all of the factorials:
+#   a_k / a_(k-1) = -24 (6k - 5)(2k - 1)(6k - 1) / (k^3 C3^3)
+# so every new term is the previous one times a small integer ratio, instead of three
+#   factorials and a power computed from scratch
+# Each step rounds once, the error after n terms is about n units in the last place,
+#   which the guard digits absorb
+class ChudnovskySeries:
+    def __init__(self):
+        self.terms = 0
+        # a_k of the next term to add
+        self.term = Decimal(1)
+        # sum of a_k * (C1 * k + C2) over the terms added so far
+        self.partial_sum = Decimal(0)
+
+    def add_term(self):
+        k = self.terms
+        self.partial_sum += self.term * (C1 * k + C2)
+        self.terms = k = k + 1
+        # Two divisions by numbers of at most 19 digits are cheaper than one by their product
+        self.term = self.term * (-24 * (6 * k - 5) * (2 * k - 1) * (6 * k - 1))
+        self.term = self.term / k**3 / C3_CUBED
+
+    # Add terms until the series has num_terms of them
+    def extend(self, num_terms):
+        while self.terms < num_terms:
+            self.add_term()
+
+    # pi from the terms so far, 1 / pi = 12 * partial_sum / C3^(3/2)
+    # C3^(3/2) is taken as C3 * sqrt(C3), a non-integer power would go through exp and ln
+    def pi(self):
+        return C3 * C3.sqrt() / (Decimal(12) * self.partial_sum)
+
+
 # Function to compute pi using the Chudnovsky series
 def chudnovsky_term(num_terms):
-    series_sum = Decimal(0)
-    for k in range(num_terms):
-        series_sum += chudnovsky(k)
-    # Multiply by 12 to get 1/pi
-    return Decimal(1) / (Decimal(12) * series_sum)
+    series = ChudnovskySeries()
+    series.extend(num_terms)
+    return series.pi()
 
 
+# Adds one term per iteration to the same series instead of summing it again from 0
 def chudnovsky_precision(precision):
     getcontext().prec = precision + int(precision * 1 / 10)
 
     terms = 2
     prev = Decimal(0)
+    series = ChudnovskySeries()
 
     while True:
-        curr = chudnovsky_term(terms)
-        diff_idx = find_diff_index(prev, curr)
+        series.extend(terms)
+        curr = series.pi()
+        diff_idx = agreeing_digits(prev, curr)
         if diff_idx > precision:
             return curr, terms, diff_idx
 
@@ -50,5 +94,13 @@ def chudnovsky_precision(precision):
         terms += 1
 
 
+# Single pass: sum exactly the number of terms the precision needs, once
+def chudnovsky_single_pass(precision):
+    getcontext().prec = precision + GUARD_DIGITS
+
+    terms = terms_for_precision(precision)
+    return chudnovsky_term(terms), terms, guaranteed_digits(terms, precision)
+
+
 if __name__ == "__main__":
     pass
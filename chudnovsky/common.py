@@ -1,6 +1,94 @@
+from decimal import Decimal, getcontext
+import math
+import sys
+
+# Each term of the Chudnovsky series shrinks by a factor of about 640320^3 / 12^3,
+#   so every additional term adds log10(640320^3 / 1728) ~ 14.18 correct digits
+DIGITS_PER_TERM = math.log10(640320**3 / 1728)
+
+# Extra working digits so rounding in the final sqrt and division stays out of the result
+GUARD_DIGITS = 10
+
+# Characters compared at a time by find_diff_index
+COMPARE_CHUNK = 1 << 16
+
+LOG10_2 = math.log10(2)
+
+# gmpy2's mpz multiplies large integers with GMP, which is much faster than Python ints
+#   at 10^5 digits and beyond. Without gmpy2 everything falls back to Python ints
+# powmod(b, e, m) is the built-in three argument pow without gmpy2
+try:
+    from gmpy2 import mpz, isqrt, powmod
+
+    BACKEND = "gmpy2"
+except ImportError:
+    from math import isqrt
+
+    mpz = int
+    powmod = pow
+    BACKEND = "int"
+
+
 # Calculate where two calculatins of Pi differ in precision
+# Both numbers are converted to strings once and compared a chunk at a time, which is a
+#   plain memory comparison. Only the first chunk that differs is searched character by
+#   character
 def find_diff_index(n1, n2):
-    for i, (d1, d2) in enumerate(zip(str(n1), str(n2))):
-        if d1 != d2:
-            return i
-    return len(str(n1))
+    s1, s2 = to_decimal_string(n1), to_decimal_string(n2)
+    length = min(len(s1), len(s2))
+    for start in range(0, length, COMPARE_CHUNK):
+        end = min(start + COMPARE_CHUNK, length)
+        if s1[start:end] != s2[start:end]:
+            for i in range(start, end):
+                if s1[i] != s2[i]:
+                    return i
+    return len(s1)
+
+
+# Number of significant digits two approximations of the same number agree on, computed
+#   from the size of their difference instead of comparing digits: a and b agree to about
+#   a.adjusted() - (a - b).adjusted() digits. Works on Decimals and on fixed-point ints
+# Unlike find_diff_index this counts 3.1999... and 3.2000... as close, which is what a
+#   convergence test wants. Equal Decimals agree to the working precision
+def agreeing_digits(a, b):
+    if a == b:
+        if isinstance(a, Decimal):
+            return getcontext().prec
+        return decimal_digits(a)
+    if isinstance(a, Decimal):
+        return max(0, b.adjusted() - (a - b).adjusted())
+    return max(0, decimal_digits(b) - decimal_digits(a - b))
+
+
+# Number of decimal digits of an int, without converting it to a string
+def decimal_digits(n):
+    n = abs(n)
+    if n == 0:
+        return 1
+    digits = int(n.bit_length() * LOG10_2)
+    # The estimate is at most one too low
+    return digits + 1 if n >= 10**digits else digits
+
+
+# Number of series terms needed for the requested precision, known before computing anything
+# Binary splitting needs at least 2 terms (the k = 0 term plus the range [1, terms))
+def terms_for_precision(precision):
+    return max(2, math.ceil(precision / DIGITS_PER_TERM) + 1)
+
+
+# Digits that are guaranteed correct after summing the given number of terms at the given
+#   working precision (up to the usual caveat of a long run of 9s being rounded up)
+def guaranteed_digits(terms, precision):
+    return min(math.floor(terms * DIGITS_PER_TERM), precision)
+
+
+# Decimal string of a (possibly huge) integer
+# Python refuses to convert ints with more than 4300 digits by default, the limit is
+#   lifted only for this conversion
+def to_decimal_string(n):
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        return str(n)
+    finally:
+        sys.set_int_max_str_digits(limit)
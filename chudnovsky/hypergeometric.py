@@ -0,0 +1,282 @@
+from checkpoint import checkpointed_binary_split
+from common import mpz, isqrt, DIGITS_PER_TERM, GUARD_DIGITS
+from output import write_pi
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from time import time
+import argparse
+import math
+import os
+
+# Binary splitting for any series of the form
+#   S = sum_k a(k) * prod_{j=1..k} p(j) / q(j)
+# with integer polynomials p, q and a, i.e. every term is the previous one times the
+#   rational function p(k) / q(k) (a(k) is kept out of the ratio so p and q stay small)
+# Binary splitting of [a, b) gives P = prod p(j), Q = prod q(j) and R with
+#   R / Q = sum_{k=a..b-1} a(k) * prod_{j=a..k} p(j) / q(j)
+# merged exactly like in the Chudnovsky engines, so S = a(0) + R / Q over [1, n)
+# The Chudnovsky series is one instance, with p(k) = -(6k - 5)(2k - 1)(6k - 1),
+#   q(k) = 640320^3 / 24 * k^3 and a(k) = 13591409 + 545140134k
+# A series also knows how many terms a precision needs and how to turn Q and R into the
+#   constant as a fixed-point integer, floor(constant * 10^precision)
+# Series are looked up by name in SERIES, which is what lets the leaf function cross into
+#   the process pool: the workers get the name, not the polynomials
+# This is the one binary splitting core: the Chudnovsky engines use the registered
+#   "chudnovsky" series, the Decimal one with Python int leaves
+SERIES = {}
+
+# Below this many terms starting a process pool costs more than it saves
+PARALLEL_MIN_TERMS = 2000
+
+# More chunks than workers evens out the load, the last chunks have slightly larger terms
+CHUNKS_PER_WORKER = 2
+
+
+class HypergeometricSeries:
+    # digits_per_term is the limit of -log10 |p(k) / q(k)|, for series whose terms shrink
+    #   by a constant factor. Series that converge faster pass terms(precision) instead
+    def __init__(self, name, p, q, a, finish, digits_per_term=None, terms=None):
+        self.name = name
+        self.p = p
+        self.q = q
+        self.a = a
+        self.finish = finish
+        self.digits_per_term = digits_per_term
+        self.terms_function = terms
+
+    # Number of terms (including k = 0) for the precision, like terms_for_precision
+    def terms(self, precision):
+        if self.terms_function:
+            return self.terms_function(precision)
+        return max(2, math.ceil(precision / self.digits_per_term) + 1)
+
+
+def register(series):
+    SERIES[series.name] = series
+    return series
+
+
+# The leaves are created as integer (mpz by default), so every product further up the
+#   tree is done by that type
+def binary_split(series, a, b, integer=mpz):
+    # Base case
+    if b == a + 1:
+        Pab = integer(series.p(a))
+        Qab = integer(series.q(a))
+        Rab = Pab * series.a(a)
+    else:
+        m = (a + b) // 2
+        Pam, Qam, Ram = binary_split(series, a, m, integer)
+        Pmb, Qmb, Rmb = binary_split(series, m, b, integer)
+
+        Pab = Pam * Pmb
+        Qab = Qam * Qmb
+        Rab = Qmb * Ram + Pam * Rmb
+
+    return Pab, Qab, Rab
+
+
+# Leaf-range function for a registered series, picklable for the process pool as
+#   partial(split_series, name)
+def split_series(name, a, b, integer=mpz):
+    return binary_split(SERIES[name], a, b, integer)
+
+
+def multiply(x, y):
+    return x * y
+
+
+# Binary splitting spread over a process pool
+# [a, b) is cut into chunks that are split independently in the pool, then the chunk
+#   triples are merged pairwise level by level exactly like the recursion in binary_split
+#   would. A merge of [a, m) and [m, b) needs four independent products (Pam * Pmb,
+#   Qam * Qmb, Qmb * Ram, Pam * Rmb), which run in the pool too. At the top levels,
+#   where only a few merges of huge numbers are left, that keeps up to 4 workers busy
+#   per merge instead of one
+# split is the leaf-range function, e.g. partial(split_series, name)
+def parallel_binary_split(split, a, b, workers=None):
+    workers = workers or os.cpu_count()
+    if workers <= 1 or b - a < PARALLEL_MIN_TERMS:
+        return split(a, b)
+
+    num_chunks = min(workers * CHUNKS_PER_WORKER, b - a)
+    bounds = [a + (b - a) * i // num_chunks for i in range(num_chunks + 1)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        triples = list(pool.map(split, bounds[:-1], bounds[1:]))
+
+        while len(triples) > 1:
+            pending = []
+            for (Pam, Qam, Ram), (Pmb, Qmb, Rmb) in zip(triples[0::2], triples[1::2]):
+                products = (Pam, Pmb), (Qam, Qmb), (Qmb, Ram), (Pam, Rmb)
+                pending.append([pool.submit(multiply, x, y) for x, y in products])
+
+            merged = []
+            for futures in pending:
+                Pab, Qab, QmbRam, PamRmb = (future.result() for future in futures)
+                merged.append((Pab, Qab, QmbRam + PamRmb))
+            if len(triples) % 2:
+                merged.append(triples[-1])
+            triples = merged
+
+    return triples[0]
+
+
+# floor(constant * 10^precision) for a registered series
+# workers > 1 splits in a process pool. With a directory, chunks are checkpointed in a
+#   subdirectory per series and reused by later runs, see checkpoint.py
+def compute(name, precision, workers=1, directory=None):
+    series = SERIES[name]
+    terms = series.terms(precision)
+    split = partial(split_series, name)
+    if directory:
+        P1n, Q1n, R1n = checkpointed_binary_split(
+            split, 1, terms, Path(directory) / name, workers
+        )
+    else:
+        P1n, Q1n, R1n = parallel_binary_split(split, 1, terms, workers)
+    return series.finish(Q1n, R1n, precision), terms
+
+
+# floor(10^precision * numerator / denominator), for constants that are a rational
+#   multiple of the series sum and need no guard digits
+def fixed_point(numerator, denominator, precision):
+    return numerator * mpz(10) ** precision // denominator
+
+
+# Sum of 1 / k!, every term ratio is 1 / k
+# The terms shrink faster and faster, so the count comes from log10(n!) > precision
+def e_terms(precision):
+    terms = 2
+    while math.lgamma(terms + 1) / math.log(10) < precision + 1:
+        terms *= 2
+    low, high = terms // 2, terms
+    while low < high:
+        middle = (low + high) // 2
+        if math.lgamma(middle + 1) / math.log(10) < precision + 1:
+            low = middle + 1
+        else:
+            high = middle
+    return max(2, low + 1)
+
+
+register(
+    HypergeometricSeries(
+        "e",
+        p=lambda k: 1,
+        q=lambda k: k,
+        a=lambda k: 1,
+        finish=lambda Q, R, precision: fixed_point(Q + R, Q, precision),
+        terms=e_terms,
+    )
+)
+
+# ln 2 = 3/4 * sum (-1)^k (k!)^2 / (2^k (2k + 1)!)
+register(
+    HypergeometricSeries(
+        "ln2",
+        p=lambda k: -k,
+        q=lambda k: 4 * (2 * k + 1),
+        a=lambda k: 1,
+        finish=lambda Q, R, precision: fixed_point(3 * (Q + R), 4 * Q, precision),
+        digits_per_term=math.log10(8),
+    )
+)
+
+# Catalan's constant, Lupas' series
+#   G = 1/64 * sum_{n>=1} (-1)^(n-1) 256^n (40n^2 - 24n + 3) (2n)!^3 (n!)^2
+#                                     / (n^3 (2n - 1) (4n)!^2)
+# rewritten with k = n - 1 so the ratio of consecutive terms is a ratio of polynomials
+#   G = 1/18 * sum_k (40k^2 + 56k + 19) prod_{j=1..k} p(j) / q(j)
+#   p(j) = -32 j^3 (2j - 1), q(j) = ((4j + 1)(4j + 3))^2
+register(
+    HypergeometricSeries(
+        "catalan",
+        p=lambda k: -32 * k**3 * (2 * k - 1),
+        q=lambda k: ((4 * k + 1) * (4 * k + 3)) ** 2,
+        a=lambda k: 40 * k**2 + 56 * k + 19,
+        finish=lambda Q, R, precision: fixed_point(19 * Q + R, 18 * Q, precision),
+        digits_per_term=math.log10(4),
+    )
+)
+
+# zeta(3), Amdeberhan and Zeilberger's series
+#   zeta(3) = 1/64 * sum (-1)^k (k!)^10 (205k^2 + 250k + 77) / ((2k + 1)!)^5
+register(
+    HypergeometricSeries(
+        "zeta3",
+        p=lambda k: -(k**5),
+        q=lambda k: 32 * (2 * k + 1) ** 5,
+        a=lambda k: 205 * k**2 + 250 * k + 77,
+        finish=lambda Q, R, precision: fixed_point(77 * Q + R, 64 * Q, precision),
+        digits_per_term=math.log10(1024),
+    )
+)
+
+
+# Final step from the Chudnovsky sums Q and R of [1, terms) to floor(pi * 10^precision)
+# pi = 426880 * sqrt(10005) * Q / (13591409 * Q + R). sqrt(10005) is taken as the integer
+#   square root of 10005 * 10^(2 * scale), i.e. sqrt(10005) scaled by 10^scale, and a
+#   single integer division produces the scaled result
+# The guard digits absorb the truncation of the square root and the division
+def pi_from_split(Q1n, R1n, precision):
+    scale = mpz(10) ** (precision + GUARD_DIGITS)
+    sqrt_10005 = isqrt(10005 * scale * scale)
+    pi = (426880 * sqrt_10005 * Q1n) // (13591409 * Q1n + R1n)
+    return pi // mpz(10) ** GUARD_DIGITS
+
+
+# pi = 9801 / (2 sqrt(2) * S), with sqrt(8) scaled like sqrt(10005) in pi_from_split
+def ramanujan_finish(Q1n, R1n, precision):
+    scale = mpz(10) ** (precision + GUARD_DIGITS)
+    sqrt_8 = isqrt(8 * scale * scale)
+    pi = (9801 * scale * scale * Q1n) // (sqrt_8 * (1103 * Q1n + R1n))
+    return pi // mpz(10) ** GUARD_DIGITS
+
+
+# Ramanujan's series for pi
+#   1 / pi = 2 sqrt(2) / 9801 * sum (4k)! (1103 + 26390k) / ((k!)^4 396^(4k))
+register(
+    HypergeometricSeries(
+        "ramanujan",
+        p=lambda k: 8 * (4 * k - 3) * (2 * k - 1) * (4 * k - 1),
+        q=lambda k: 396**4 * k**3,
+        a=lambda k: 1103 + 26390 * k,
+        finish=ramanujan_finish,
+        digits_per_term=math.log10(396**4 / 256),
+    )
+)
+
+register(
+    HypergeometricSeries(
+        "chudnovsky",
+        p=lambda k: -(6 * k - 5) * (2 * k - 1) * (6 * k - 1),
+        q=lambda k: 10939058860032000 * k**3,
+        a=lambda k: 13591409 + 545140134 * k,
+        finish=pi_from_split,
+        digits_per_term=DIGITS_PER_TERM,
+    )
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compute a constant with hypergeometric binary splitting"
+    )
+    parser.add_argument("constant", choices=list(SERIES))
+    parser.add_argument("digits", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--checkpoint", help="checkpoint directory, reused across runs")
+    parser.add_argument("--output", help="write the digits to this file")
+    args = parser.parse_args()
+
+    start_time = time()
+    value, terms = compute(args.constant, args.digits, args.workers, args.checkpoint)
+    end_time = time()
+    print(
+        f"Computed {args.digits} digits of {args.constant} in {terms} terms"
+        f" in {end_time - start_time:.2f}s"
+    )
+    if args.output:
+        write_pi(value, args.digits, args.output)
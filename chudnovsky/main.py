@@ -1,12 +1,33 @@
 import chudnovsky_optimized
 import chudnovsky_unoptimized
+import chudnovsky_integer
+import verify
+import output
 from decimal import Decimal, getcontext
 from time import time
-from common import find_diff_index
-
+from common import find_diff_index, guaranteed_digits
 
 DECIMAL_PRECISION = 1000
 
+# Compute the number of terms from the precision and sum the series once, instead of
+#   adding one term at a time until two consecutive results agree
+SINGLE_PASS = True
+
+# Processes used for binary splitting in the single pass engines (1 runs it serially)
+WORKERS = 1
+
+# Write the integer engine's digits to this file (None to skip), streamed in chunks so
+#   huge runs never build the full string. OUTPUT_HEX writes hexadecimal digits instead
+OUTPUT_PATH = None
+OUTPUT_HEX = False
+
+# Check the integer engine's digits with the BBP formula. With SPOT_CHECK_POSITIONS None
+#   only hex digits up to verify.DEFAULT_MAX_POSITION are checked, checking the end of a
+#   long result ([verify.last_hex_position(DECIMAL_PRECISION)]) takes about 4s per 10^6
+#   digits, several times the computation itself
+SPOT_CHECK = True
+SPOT_CHECK_POSITIONS = None
+
 
 if __name__ == "__main__":
     print(
@@ -15,21 +36,58 @@ if __name__ == "__main__":
     prev = Decimal(0)
 
     start_time = time()
-    pi1, terms, diff_idx = chudnovsky_unoptimized.chudnovsky_precision(
-        DECIMAL_PRECISION
-    )
+    if SINGLE_PASS:
+        pi1, terms, diff_idx = chudnovsky_unoptimized.chudnovsky_single_pass(
+            DECIMAL_PRECISION
+        )
+    else:
+        pi1, terms, diff_idx = chudnovsky_unoptimized.chudnovsky_precision(
+            DECIMAL_PRECISION
+        )
     end_time = time()
     print(
         f"\033[96mUnoptimized took {end_time - start_time:.2f}s to reach {diff_idx} digits of Pi in {terms} terms.\n"
     )
 
     start_time = time()
-    pi2, terms, diff_idx = chudnovsky_optimized.chudnovsky_precision(DECIMAL_PRECISION)
+    if SINGLE_PASS:
+        pi2, terms, diff_idx = chudnovsky_optimized.chudnovsky_single_pass(
+            DECIMAL_PRECISION, WORKERS
+        )
+    else:
+        pi2, terms, diff_idx = chudnovsky_optimized.chudnovsky_precision(
+            DECIMAL_PRECISION
+        )
     end_time = time()
     print(
         f"\033[96mOptimized took {end_time - start_time:.2f}s to reach {diff_idx} digits of Pi in {terms} terms.\n"
     )
 
+    start_time = time()
+    # Kept as the fixed-point integer, for the spot check and the file output below
+    pi3, terms = chudnovsky_integer.pi_fixed_point(DECIMAL_PRECISION, WORKERS)
+    diff_idx = guaranteed_digits(terms, DECIMAL_PRECISION)
+    end_time = time()
+    print(
+        f"\033[96mInteger ({chudnovsky_integer.BACKEND}) took {end_time - start_time:.2f}s to reach {diff_idx} digits of Pi in {terms} terms.\n"
+    )
+
+    # Independent check of the integer engine's digits with the BBP formula
+    if SPOT_CHECK:
+        start_time = time()
+        checks = verify.spot_check(pi3, DECIMAL_PRECISION, SPOT_CHECK_POSITIONS)
+        passed = all(expected == found for _, expected, found in checks)
+        if checks:
+            print(
+                f"\033[96mBBP spot check at hex digit {checks[-1][0]}: {'passed' if passed else 'FAILED'} ({time() - start_time:.2f}s).\n"
+            )
+        else:
+            print(f"\033[96mBBP spot check skipped, too few digits to check.\n")
+
+    if OUTPUT_PATH:
+        output.write_pi(pi3, DECIMAL_PRECISION, OUTPUT_PATH, hex=OUTPUT_HEX)
+        print(f"\033[96mWrote the digits of Pi to {OUTPUT_PATH}.\n")
+
     diff_idx = find_diff_index(pi1, pi2)
     print(
         f"\033[92m{str(pi2)[:DECIMAL_PRECISION]}\033[93m{str(pi2)[DECIMAL_PRECISION:diff_idx]}"
@@ -0,0 +1,88 @@
+import argparse
+import math
+
+# Writing a huge pi to a file without ever holding its full digit string in memory
+# Decimal: divide-and-conquer radix conversion. The number is split in two halves with a
+#   single divmod by 10^(half the digits), each half is split again, and so on down to
+#   leaves of LEAF_DIGITS digits, which are small enough for str(). Leaves come out in
+#   order and go straight to the file, so the only large objects alive are the pieces of
+#   the number on the current path of the recursion and the powers of ten
+# The powers 10^(LEAF_DIGITS * 2^i) are computed once by repeated squaring and shared by
+#   every split on the same level. With gmpy2 the divisions are subquadratic
+# Hex: the fraction is scaled by a power of 16 once and written from its bytes, a base
+#   conversion that is linear in the number of digits
+LEAF_DIGITS = 2048
+HEX_CHUNK_BYTES = 1 << 20
+
+
+# 10^LEAF_DIGITS, 10^(2 * LEAF_DIGITS), 10^(4 * LEAF_DIGITS), ... up to `levels` entries
+def split_powers(levels):
+    powers = [10**LEAF_DIGITS]
+    for _ in range(levels - 1):
+        powers.append(powers[-1] * powers[-1])
+    return powers
+
+
+# Decimal digits of 0 <= n < 10^(LEAF_DIGITS * 2^level), zero padded to exactly that many,
+#   yielded a leaf at a time from the most significant end
+def decimal_leaves(n, level, powers):
+    if level == 0:
+        yield str(n).zfill(LEAF_DIGITS)
+        return
+    high, low = divmod(n, powers[level - 1])
+    yield from decimal_leaves(high, level - 1, powers)
+    yield from decimal_leaves(low, level - 1, powers)
+
+
+# Write the fraction 0 <= n < 10^digits as exactly `digits` decimal digits
+def write_decimal(f, n, digits):
+    level = max(0, math.ceil(math.log2(max(1, digits / LEAF_DIGITS))))
+    padding = LEAF_DIGITS * 2**level - digits
+    powers = split_powers(level)
+    for leaf in decimal_leaves(n, level, powers):
+        if padding >= len(leaf):
+            padding -= len(leaf)
+            continue
+        f.write(leaf[padding:])
+        padding = 0
+
+
+# Number of hex digits after the point a result with `precision` decimal digits supports
+#   (rounded down to a whole number of bytes)
+def hex_digits_for_precision(precision):
+    return int(precision * math.log(10, 16)) // 2 * 2
+
+
+# Write the hex digits of the fraction n / 10^precision
+def write_hex(f, n, precision):
+    digits = hex_digits_for_precision(precision)
+    scaled = (n << (4 * digits)) // 10**precision
+    data = int(scaled).to_bytes(digits // 2, "big")
+    for start in range(0, len(data), HEX_CHUNK_BYTES):
+        f.write(data[start : start + HEX_CHUNK_BYTES].hex())
+
+
+# Write floor(pi * 10^precision) to a file as "3.1415..." or, with hex=True, "3.243f..."
+def write_pi(pi, precision, path, hex=False):
+    integer_part, fraction = divmod(pi, 10**precision)
+    with open(path, "w") as f:
+        f.write(f"{int(integer_part)}.")
+        if hex:
+            write_hex(f, fraction, precision)
+        else:
+            write_decimal(f, fraction, precision)
+
+
+if __name__ == "__main__":
+    from chudnovsky_integer import pi_fixed_point
+
+    parser = argparse.ArgumentParser(description="Compute pi and write its digits")
+    parser.add_argument("digits", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--hex", action="store_true", help="write hexadecimal digits")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    pi, terms = pi_fixed_point(args.digits, args.workers)
+    write_pi(pi, args.digits, args.path, hex=args.hex)
+    print(f"Wrote {args.digits} digits of Pi ({terms} terms) to {args.path}")
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The chudnovsky modules import each other as top level modules, e.g. "from common
+#   import ...", so the tests run with the project directory on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
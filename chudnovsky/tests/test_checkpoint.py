@@ -0,0 +1,83 @@
+from checkpoint import (
+    checkpointed_binary_split,
+    chunk_path,
+    load_triple,
+    plan_chunks,
+    read_int,
+    save_triple,
+    write_int,
+)
+from hypergeometric import split_series, pi_from_split, compute
+from chudnovsky_integer import pi_fixed_point
+from functools import partial
+from pathlib import Path
+import io
+import pytest
+
+split = partial(split_series, "chudnovsky")
+TERMS = 200
+CHUNK = 30
+
+
+def pi_from(triple, precision):
+    P, Q, R = triple
+    return pi_from_split(Q, R, precision)
+
+
+def test_int_round_trip():
+    for n in (0, 1, -1, 255, -256, 7**500, -(3**1000)):
+        f = io.BytesIO()
+        write_int(f, n)
+        f.seek(0)
+        assert read_int(f) == n
+
+
+def test_checkpoint_matches_split(tmp_path):
+    triple = checkpointed_binary_split(split, 1, TERMS, tmp_path, chunk_terms=CHUNK)
+    assert triple == split(1, TERMS)
+    # Every grid chunk and the whole range are on disk
+    assert chunk_path(tmp_path, 1, TERMS).exists()
+    assert len(list(tmp_path.glob("*.pqr"))) == TERMS // CHUNK + 2
+
+
+# A killed run leaves some chunks behind, the next run only computes the others
+def test_resume_after_partial_run(tmp_path):
+    checkpointed_binary_split(split, 1, TERMS, tmp_path, chunk_terms=CHUNK)
+    chunk_path(tmp_path, 1, TERMS).unlink()
+    for number, path in enumerate(sorted(tmp_path.glob("*.pqr"))):
+        if number % 2:
+            path.unlink()
+
+    plan = plan_chunks(1, TERMS, tmp_path, CHUNK)
+    assert any(saved for _, _, saved in plan)
+    assert not all(saved for _, _, saved in plan)
+    triple = checkpointed_binary_split(
+        split, 1, TERMS, tmp_path, workers=2, chunk_terms=CHUNK
+    )
+    assert triple == split(1, TERMS)
+
+
+# More digits later reuse the earlier result as one chunk
+def test_extend_precision(tmp_path):
+    checkpointed_binary_split(split, 1, TERMS, tmp_path, chunk_terms=CHUNK)
+    plan = plan_chunks(1, 2 * TERMS, tmp_path, CHUNK)
+    assert plan[0] == (1, TERMS, True)
+
+    triple = checkpointed_binary_split(split, 1, 2 * TERMS, tmp_path, chunk_terms=CHUNK)
+    assert pi_from(triple, 5000) == pi_from(split(1, 2 * TERMS), 5000)
+
+
+def test_pi_fixed_point_with_directory(tmp_path):
+    pi, terms = pi_fixed_point(3000, directory=tmp_path)
+    assert (pi, terms) == pi_fixed_point(3000)
+    assert (Path(tmp_path) / "chudnovsky").is_dir()
+    # A second run reads everything back
+    assert pi_fixed_point(3000, directory=tmp_path) == (pi, terms)
+    assert compute("e", 500, directory=tmp_path) == compute("e", 500)
+
+
+def test_load_rejects_wrong_range(tmp_path):
+    save_triple(tmp_path, 1, 10, split(1, 10))
+    chunk_path(tmp_path, 1, 10).rename(chunk_path(tmp_path, 1, 11))
+    with pytest.raises(ValueError):
+        load_triple(tmp_path, 1, 11)
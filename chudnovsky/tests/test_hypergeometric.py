@@ -0,0 +1,88 @@
+from hypergeometric import (
+    SERIES,
+    binary_split,
+    compute,
+    parallel_binary_split,
+    split_series,
+)
+from decimal import Decimal, localcontext
+from functools import partial
+import hypergeometric
+import math
+import pytest
+
+DIGITS = 300
+
+
+# floor(pi * 10^digits) by Machin's formula pi = 16 atan(1/5) - 4 atan(1/239), in
+#   fixed point with guard digits, sharing nothing with the series under test
+def machin_pi(digits):
+    scale = 10 ** (digits + 10)
+
+    def arctan_inverse(x):
+        total, power, k = 0, scale // x, 0
+        while power:
+            total += (-1) ** k * (power // (2 * k + 1))
+            power //= x * x
+            k += 1
+        return total
+
+    return (16 * arctan_inverse(5) - 4 * arctan_inverse(239)) // 10**10
+
+
+# Reference values from formulas that do not use the hypergeometric code, as Decimals
+#   with 20 guard digits
+def reference(name, digits):
+    with localcontext() as context:
+        context.prec = digits + 20
+        if name == "e":
+            return Decimal(1).exp()
+        if name == "ln2":
+            return Decimal(2).ln()
+        if name == "catalan":
+            # G = pi/8 ln(2 + sqrt(3)) + 3/8 sum 1 / ((2n + 1)^2 C(2n, n))
+            pi = Decimal(machin_pi(digits + 20)).scaleb(-(digits + 20))
+            total = sum(
+                Decimal(1) / ((2 * n + 1) ** 2 * math.comb(2 * n, n))
+                for n in range(2 * digits)
+            )
+            return pi / 8 * (2 + Decimal(3).sqrt()).ln() + 3 * total / 8
+        if name == "zeta3":
+            # zeta(3) = 5/2 sum (-1)^(n + 1) / (n^3 C(2n, n))
+            total = sum(
+                Decimal((-1) ** (n + 1)) / (n**3 * math.comb(2 * n, n))
+                for n in range(1, 2 * digits)
+            )
+            return 5 * total / 2
+        return Decimal(machin_pi(digits + 20)).scaleb(-(digits + 20))
+
+
+@pytest.mark.parametrize("name", sorted(SERIES))
+def test_series_match_reference(name):
+    value, terms = compute(name, DIGITS)
+    with localcontext() as context:
+        context.prec = DIGITS + 40
+        expected = int(reference(name, DIGITS).scaleb(DIGITS))
+    assert abs(value - expected) <= 1
+
+
+# The term count is enough: a longer computation agrees on all the digits
+@pytest.mark.parametrize("name", sorted(SERIES))
+def test_terms_suffice(name):
+    short, _ = compute(name, DIGITS)
+    long, _ = compute(name, DIGITS + 100)
+    assert abs(long // 10**100 - short) <= 1
+
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(hypergeometric, "PARALLEL_MIN_TERMS", 10)
+    split = partial(split_series, "chudnovsky")
+    assert parallel_binary_split(split, 1, 101, workers=3) == split(1, 101)
+    assert compute("catalan", DIGITS, workers=2) == compute("catalan", DIGITS)
+
+
+def test_integer_type_of_leaves():
+    series = SERIES["chudnovsky"]
+    P, Q, R = binary_split(series, 1, 20, integer=int)
+    assert all(type(n) is int for n in (P, Q, R))
+    assert (P, Q, R) == tuple(map(int, binary_split(series, 1, 20)))
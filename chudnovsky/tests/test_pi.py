@@ -0,0 +1,102 @@
+from test_hypergeometric import machin_pi
+from chudnovsky_integer import pi_fixed_point
+from common import agreeing_digits, find_diff_index, to_decimal_string
+from output import write_pi
+from decimal import Decimal, localcontext
+import chudnovsky_optimized
+import chudnovsky_unoptimized
+import chudnovsky_integer
+import verify
+import pytest
+import math
+
+DIGITS = 1000
+
+
+@pytest.fixture(scope="module")
+def pi():
+    return pi_fixed_point(DIGITS)[0]
+
+
+def decimal_digits(value, digits):
+    with localcontext() as context:
+        context.prec = digits + 50
+        return int(Decimal(value).scaleb(digits))
+
+
+def test_engines_agree(pi):
+    assert pi == machin_pi(DIGITS)
+    for engine in (chudnovsky_unoptimized, chudnovsky_optimized):
+        value, terms, guaranteed = engine.chudnovsky_single_pass(DIGITS)
+        assert guaranteed == DIGITS
+        assert abs(decimal_digits(value, DIGITS) - pi) <= 1
+
+    value, terms, guaranteed = chudnovsky_integer.chudnovsky_single_pass(DIGITS)
+    assert decimal_digits(value, DIGITS) == pi
+
+
+def test_convergence_loop():
+    value, terms, agreeing = chudnovsky_optimized.chudnovsky_precision(200)
+    assert agreeing > 200
+    assert abs(decimal_digits(value, 200) - machin_pi(200)) <= 1
+
+
+def test_compare():
+    assert find_diff_index("3.14159", "3.14159") == 7
+    assert find_diff_index("3.14159", "3.14199") == 5
+    assert agreeing_digits(31415926, 31415927) == 7
+    assert agreeing_digits(Decimal("3.2000"), Decimal("3.1999")) >= 3
+
+
+def test_spot_check_passes(pi):
+    last = verify.last_hex_position(DIGITS)
+    checks = verify.spot_check(pi, DIGITS, [0, 1, 100, last])
+    assert [position for position, _, _ in checks] == [0, 1, 100, last]
+    assert all(expected == found for _, expected, found in checks)
+    # pi = 3.243F6A88 85A308D3 in hex
+    assert checks[0][1] == 0x243F6A88
+    assert checks[1][1] == 0x43F6A888
+
+    assert verify.spot_check(pi, DIGITS) == verify.spot_check(pi, DIGITS, [last])
+    assert verify.spot_check(str(pi)[0] + "." + str(pi)[1:], DIGITS, [last]) == (
+        verify.spot_check(pi, DIGITS, [last])
+    )
+
+
+def test_spot_check_finds_errors(pi):
+    last = verify.last_hex_position(DIGITS)
+    corrupted = pi + 10**20
+    digits, passed = verify.verify(pi, corrupted, DIGITS)
+    assert digits < DIGITS - 10
+    assert not passed
+    assert verify.verify(pi, pi, DIGITS) == (DIGITS + 1, True)
+
+    with pytest.raises(ValueError):
+        verify.spot_check(pi, DIGITS, [last + 1])
+
+
+def test_spot_check_defaults():
+    assert verify.spot_check(314, 2) == []
+    pi, _ = pi_fixed_point(30000)
+    checks = verify.spot_check(pi, 30000)
+    assert [position for position, _, _ in checks] == [verify.DEFAULT_MAX_POSITION]
+    assert checks[0][1] == checks[0][2]
+
+
+@pytest.mark.parametrize("digits", [5, DIGITS, 5000])
+def test_write_pi(tmp_path, digits):
+    pi, _ = pi_fixed_point(digits)
+    path = tmp_path / "pi.txt"
+    write_pi(pi, digits, path)
+    text = to_decimal_string(pi)
+    assert path.read_text() == f"{text[0]}.{text[1:]}"
+
+    write_pi(pi, digits, path, hex=True)
+    hex_digits = path.read_text()
+    assert "3.243f6a8885a308d3".startswith(hex_digits[:18])
+    assert len(hex_digits) - 2 == 2 * int(digits * math.log(10, 16) / 2)
+    position = verify.last_hex_position(digits)
+    if position >= 0:
+        assert int(hex_digits[2 + position : 10 + position], 16) == (
+            verify.bbp_hex_digits(position)
+        )
@@ -0,0 +1,123 @@
+from threading import Thread
+from queue import Queue
+from time import time
+import os
+
+# Output file that collects text in memory and writes it in large batches
+# Writing millions of small strings costs a call each; here they are joined and encoded
+#   once per batch of buffer_size bytes and written with a single write (or a few, see
+#   write_batch)
+# With background=True the batches are written by a separate thread, fed through a queue
+#   of at most queue_size batches, so parsing continues while the disk is busy. The bound
+#   keeps memory in check when the disk is slower than the parser: once the queue is full,
+#   write blocks until the thread catches up
+# fsync is "never" (leave it to the OS), "close" (once at the end) or "batch" (after every
+#   batch, so everything written so far survives a crash)
+# Bytes written and the time spent in write and fsync calls go into the stats dict, for
+#   the write throughput reported with the progress
+BUFFER_SIZE = 1 << 22
+QUEUE_SIZE = 8
+FSYNC_POLICIES = ["never", "close", "batch"]
+
+
+class BatchedWriter:
+    def __init__(
+        self,
+        path,
+        buffer_size=BUFFER_SIZE,
+        fsync="never",
+        background=False,
+        queue_size=QUEUE_SIZE,
+        stats=None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync}")
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.stats = stats if stats is not None else {}
+        self.stats.setdefault("written_bytes", 0)
+        self.stats.setdefault("write_seconds", 0)
+
+        self.file = open(path, "wb", buffering=0)
+        self.pending = []
+        self.pending_size = 0
+
+        self.queue = None
+        self.error = None
+        if background:
+            self.queue = Queue(maxsize=queue_size)
+            self.thread = Thread(target=self.drain, daemon=True)
+            self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+
+    # Hand the pending text to the file (or to the background thread)
+    def flush(self):
+        if not self.pending:
+            return
+        data = "".join(self.pending).encode("utf-8")
+        self.pending = []
+        self.pending_size = 0
+        if self.queue is None:
+            self.write_batch(data)
+            return
+        if self.error:
+            raise self.error
+        self.queue.put(data)
+
+    # The file is unbuffered, so a write may take only part of the batch (e.g. when
+    #   interrupted by a signal) and the rest is written by further calls
+    def write_batch(self, data):
+        start_time = time()
+        view = memoryview(data)
+        while view:
+            view = view[self.file.write(view) :]
+        if self.fsync == "batch":
+            os.fsync(self.file.fileno())
+        self.stats["written_bytes"] += len(data)
+        self.stats["write_seconds"] += time() - start_time
+
+    # Background thread: write batches until the None that close puts in the queue
+    # After an error the remaining batches are dropped, the error is raised in the caller
+    def drain(self):
+        while (data := self.queue.get()) is not None:
+            if self.error is None:
+                try:
+                    self.write_batch(data)
+                except OSError as error:
+                    self.error = error
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            if self.queue is not None:
+                self.queue.put(None)
+                self.thread.join()
+            if self.error is None and self.fsync == "close":
+                start_time = time()
+                os.fsync(self.file.fileno())
+                self.stats["write_seconds"] += time() - start_time
+            self.file.close()
+        if self.error:
+            raise self.error
+
+
+# Write throughput for the progress output, e.g. "Written 120.5 MB (35.2 MB/s)"
+def throughput(stats):
+    written = stats.get("written_bytes", 0) / 1e6
+    seconds = stats.get("write_seconds", 0)
+    rate = written / seconds if seconds else 0
+    return f"Written {written:.1f} MB ({rate:.1f} MB/s)"
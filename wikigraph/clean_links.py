@@ -1,4 +1,5 @@
 import re
+from xml.sax.saxutils import escape, unescape
 
 input_file = "wiki-links-only.xml"  # Change this to your actual file
 output_file = "wiki-links-only-clean.xml"
@@ -13,47 +14,89 @@ def clean_link(link_text):
     return cleaned_link
 
 
-with (
-    open(input_file, "r", encoding="utf-8") as infile,
-    open(output_file, "w", encoding="utf-8") as outfile,
-):
-    for line in infile:
-        # Delete any line that doesn't contain a valid tag
-        if (
-            "<page>" not in line
-            and "</page>" not in line
-            and "<mediawiki>" not in line
-            and "</mediawiki>" not in line
-            and "<links>" not in line
-            and "</links>" not in line
-            and "<title>" not in line
-            and "</title>" not in line
-            and "<link>" not in line
-            and "</link>" not in line
-            and "<?xml" not in line
-        ):
-            print(f"DELETE: {line}")
-        # Delete any line without matching link tags
-        elif "<link>" in line and "</link>" not in line:
-            print(f"DELETE: {line}")
-        elif "<link>" not in line and "</link>" in line:
-            print(f"DELETE: {line}")
-        # do not allow empty <link></link>
-        elif "<link></link>" in line:
-            print(f"DELETE (empty): {line}")
-        # Process valid links
-        elif "<link>" in line and "</link>" in line:
-            match = re.match(r"^\s*<link>(?P<link_text>[^><]*)<\/link>\s*$", line)
-            if match:
-                link_text = match.group("link_text")
-                cleaned_link = clean_link(link_text)
-                if cleaned_link:  # Only write if the cleaned link isn't empty
-                    outfile.write(f"<link>{cleaned_link}</link>\n")
+# The checks the line filter below applies to a <link> line, for a single link label
+# Returns the cleaned link, or None with the reason it would have been deleted
+def check_link(link_text):
+    # do not allow empty <link></link>
+    if not link_text:
+        return None, "empty"
+    # A label spanning lines or containing a tag never forms a valid <link> line
+    if "\n" in link_text or "<" in link_text or ">" in link_text:
+        return None, "invalid format"
+    cleaned_link = clean_link(link_text)
+    if not cleaned_link:
+        return None, "empty after cleaning"
+    return cleaned_link, None
+
+
+# Stage 2 of the pipeline: clean the links of (title, links) pages in a stream, with the
+#   same result as running this script on the preprocessed XML
+# Counts of deleted links go into the stats dict if one is given
+def clean_pages(pages, stats=None):
+    stats = stats if stats is not None else {}
+    stats.setdefault("deleted_links", 0)
+    for title, links in pages:
+        cleaned_links = []
+        for link in links:
+            cleaned_link, reason = check_link(link)
+            if cleaned_link is None:
+                stats["deleted_links"] += 1
+                continue
+            cleaned_links.append(cleaned_link)
+        yield title, cleaned_links
+
+
+def clean_links_xml(input_file, output_file):
+    with (
+        open(input_file, "r", encoding="utf-8") as infile,
+        open(output_file, "w", encoding="utf-8") as outfile,
+    ):
+        for line in infile:
+            # Delete any line that doesn't contain a valid tag
+            if (
+                "<page>" not in line
+                and "</page>" not in line
+                and "<mediawiki>" not in line
+                and "</mediawiki>" not in line
+                and "<links>" not in line
+                and "</links>" not in line
+                and "<title>" not in line
+                and "</title>" not in line
+                and "<link>" not in line
+                and "</link>" not in line
+                and "<?xml" not in line
+            ):
+                print(f"DELETE: {line}")
+            # Delete any line without matching link tags
+            elif "<link>" in line and "</link>" not in line:
+                print(f"DELETE: {line}")
+            elif "<link>" not in line and "</link>" in line:
+                print(f"DELETE: {line}")
+            # do not allow empty <link></link>
+            elif "<link></link>" in line:
+                print(f"DELETE (empty): {line}")
+            # Process valid links
+            elif "<link>" in line and "</link>" in line:
+                match = re.match(
+                    r"^(?P<indent>\s*)<link>(?P<link_text>[^><]*)<\/link>\s*$", line
+                )
+                if match:
+                    # The link is escaped in the XML, checked and cleaned as text
+                    link_text = unescape(match.group("link_text"))
+                    cleaned_link, reason = check_link(link_text)
+                    if cleaned_link:  # Only write if the cleaned link isn't empty
+                        # Indented like the input, so the file matches the pipeline's
+                        indent = match.group("indent")
+                        outfile.write(f"{indent}<link>{escape(cleaned_link)}</link>\n")
+                    else:
+                        print(f"DELETE ({reason}): {line}")
                 else:
-                    print(f"DELETE (empty after cleaning): {line}")
+                    print(f"DELETE (invalid format): {line}")
             else:
-                print(f"DELETE (invalid format): {line}")
-        else:
-            outfile.write(line)
+                outfile.write(line)
+
+    print("Cleanup complete! Saved to:", output_file)
+
 
-print("Cleanup complete! Saved to:", output_file)
+if __name__ == "__main__":
+    clean_links_xml(input_file, output_file)
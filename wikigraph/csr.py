@@ -0,0 +1,133 @@
+from obsidian import read_links_xml
+from pathlib import Path
+from array import array
+import numpy as np
+
+# Binary link graph in compressed sparse row (CSR) form, a directory of .npy files:
+#   offsets.npy        int32, num_nodes + 1 entries, node i links to targets[o[i]:o[i + 1]]
+#   targets.npy        int32, one entry per link, the ID of the linked title
+#   titles.npy         uint8, all titles UTF-8 encoded back to back
+#   title_offsets.npy  int64, num_nodes + 1 entries, title i is titles[o[i]:o[i + 1]]
+# Every title that is a page or a link target is a node, so links have to name pages
+#   exactly like their titles: the graph is built from the preprocessed links, not from
+#   the ones clean_links.py renamed into Obsidian file names
+# IDs follow the sorted order of the titles, so a title's ID is found by binary search
+#   over the title table without loading it into a dictionary
+# All files load with np.load(mmap_mode="r"), so opening the graph costs nothing and
+#   every process working on it shares the same pages of memory
+# offsets switches to int64 should a graph ever have more than 2^31 - 1 links
+FILES = ["offsets", "targets", "titles", "title_offsets"]
+INT32_MAX = np.iinfo(np.int32).max
+
+
+# Assign IDs to titles and write the CSR graph of a stream of (title, links) pages
+# Links of a page are deduplicated and empty ones (e.g. from "[[#Section]]") dropped
+# Counts go into the stats dict if one is given
+def write_csr_graph(pages, output_dir, stats=None):
+    stats = stats if stats is not None else {}
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    # Provisional IDs in order of first appearance, edges as parallel compact arrays
+    ids = {}
+    sources = array("i")
+    targets = array("i")
+    for title, links in pages:
+        source = ids.setdefault(title, len(ids))
+        links = [link for link in dict.fromkeys(links) if link]
+        row = [ids.setdefault(link, len(ids)) for link in links]
+        sources.extend([source] * len(row))
+        targets.extend(row)
+
+    # Renumber by sorted title
+    titles = sorted(ids)
+    rank = np.empty(len(ids), dtype=np.int32)
+    rank[[ids[title] for title in titles]] = np.arange(len(ids), dtype=np.int32)
+    del ids
+
+    sources = rank[np.frombuffer(sources, dtype=np.int32)]
+    targets = rank[np.frombuffer(targets, dtype=np.int32)]
+    order = np.argsort(sources, kind="stable")
+    targets = targets[order]
+
+    offsets_dtype = np.int32 if len(targets) <= INT32_MAX else np.int64
+    offsets = np.zeros(len(titles) + 1, dtype=offsets_dtype)
+    np.cumsum(np.bincount(sources, minlength=len(titles)), out=offsets[1:])
+
+    encoded = [title.encode("utf-8") for title in titles]
+    title_offsets = np.zeros(len(titles) + 1, dtype=np.int64)
+    np.cumsum([len(title) for title in encoded], out=title_offsets[1:])
+    title_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    np.save(output_path / "offsets.npy", offsets)
+    np.save(output_path / "targets.npy", targets)
+    np.save(output_path / "titles.npy", title_bytes)
+    np.save(output_path / "title_offsets.npy", title_offsets)
+
+    stats["nodes"] = len(titles)
+    stats["edges"] = len(targets)
+    stats["csr_bytes"] = sum(
+        (output_path / f"{name}.npy").stat().st_size for name in FILES
+    )
+
+
+class CSRGraph:
+    def __init__(self, directory, mmap=True):
+        mmap_mode = "r" if mmap else None
+        path = Path(directory)
+        self.offsets = np.load(path / "offsets.npy", mmap_mode=mmap_mode)
+        self.targets = np.load(path / "targets.npy", mmap_mode=mmap_mode)
+        self.titles = np.load(path / "titles.npy", mmap_mode=mmap_mode)
+        self.title_offsets = np.load(path / "title_offsets.npy", mmap_mode=mmap_mode)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def title(self, node):
+        start, end = self.title_offsets[node], self.title_offsets[node + 1]
+        return self.titles[start:end].tobytes().decode("utf-8")
+
+    # IDs of the titles the node links to
+    def neighbors(self, node):
+        return self.targets[self.offsets[node] : self.offsets[node + 1]]
+
+    def out_degrees(self):
+        return np.diff(self.offsets)
+
+    # ID of a title, or -1 if it is not in the graph. Binary search over the sorted titles,
+    #   comparing UTF-8 bytes, which sort the same way as the strings
+    def find(self, title):
+        key = title.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            start, end = self.title_offsets[middle], self.title_offsets[middle + 1]
+            if self.titles[start:end].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self.title(low) == title:
+            return low
+        return -1
+
+
+# Convert the preprocessed XML (wiki-links-only.xml, before clean_links.py) to the CSR graph
+def convert_to_csr(input_xml, output_dir):
+    stats = {}
+    write_csr_graph(read_links_xml(input_xml), output_dir, stats)
+
+    print(f"\nConversion complete!")
+    print(f"Total nodes: {stats['nodes']}")
+    print(f"Total links: {stats['edges']}")
+    print(f"Size on disk: {stats['csr_bytes'] / 1e6:.1f} MB")
+    print(f"Output directory: {output_dir}")
+
+
+if __name__ == "__main__":
+    input_xml = "wiki-links-only.xml"
+    output_dir = "wiki-graph-csr"
+    convert_to_csr(input_xml, output_dir)
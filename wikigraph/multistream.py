@@ -0,0 +1,242 @@
+from xml.etree.ElementTree import iterparse
+from preprocess import parse_page, print_progress, write_links_xml, Redirect
+from batched_writer import throughput
+from xml.sax.saxutils import escape, unescape
+from collections import deque
+import multiprocessing
+import random
+import bz2
+import io
+import os
+import re
+
+# The multistream dump (enwiki-...-pages-articles-multistream.xml.bz2) is a series of
+#   independent bz2 streams: the first holds the <mediawiki> header and <siteinfo>, every
+#   following one about 100 <page> elements, the last the closing </mediawiki>
+# The index file (enwiki-...-pages-articles-multistream-index.txt.bz2) has one line
+#   "offset:page_id:title" per page, where offset is the byte position of the stream the
+#   page is in. Distinct offsets are therefore the stream boundaries
+# Streams can be decompressed and parsed without the ones before them, so ranges of
+#   consecutive streams are handed to a process pool. Results come back in dump order,
+#   so the output is identical to preprocessing the decompressed XML serially
+# Only PENDING_PER_PROCESS tasks per process are in flight at a time. The stages after
+#   this one (writing the vault, spooling for redirects) are slower than the parsers, and
+#   with everything submitted up front the parsed links of most of the dump would pile up
+#   in memory waiting for them
+STREAMS_PER_TASK = 16
+PENDING_PER_PROCESS = 2
+
+
+# Byte ranges [start, end) of the page streams, grouped streams_per_task at a time
+# The last range runs to the end of the file and includes the closing stream
+def read_stream_ranges(dump_path, index_path, streams_per_task=STREAMS_PER_TASK):
+    offsets = []
+    with bz2.open(index_path, "rt", encoding="utf-8") as index:
+        for line in index:
+            offset = int(line.split(":", 1)[0])
+            if not offsets or offset != offsets[-1]:
+                offsets.append(offset)
+
+    starts = offsets[::streams_per_task]
+    ends = starts[1:] + [os.path.getsize(dump_path)]
+    return list(zip(starts, ends))
+
+
+# Parse the pages in one range of streams, runs in the pool
+# A range of pages has no root element, so the pages are wrapped in one for iterparse
+# Returns the (title, sorted links) pages in order, the Redirects and the titles of the
+#   articles without links, which are needed to resolve redirects
+def parse_streams(dump_path, start, end):
+    with open(dump_path, "rb") as f:
+        f.seek(start)
+        data = bz2.decompress(f.read(end - start))
+    data = data.replace(b"</mediawiki>", b"")
+
+    pages = []
+    redirects = []
+    unlinked = []
+    source = io.BytesIO(b"<pages>" + data + b"</pages>")
+    for event, elem in iterparse(source, events=("end",)):
+        if elem.tag.endswith("page"):
+            page = parse_page(elem)
+            elem.clear()
+
+            if isinstance(page, Redirect):
+                redirects.append(page)
+            elif page and page[1]:
+                pages.append(page)
+            elif page:
+                unlinked.append(page[0])
+    return pages, redirects, unlinked
+
+
+# Parse the ranges in the pool and yield ((start, end), result) in dump order, keeping at
+#   most max_pending tasks submitted but not yet consumed
+def parse_ranges(dump_path, ranges, num_processes=None):
+    num_processes = num_processes or os.cpu_count()
+    max_pending = PENDING_PER_PROCESS * num_processes
+    pending = deque()
+    with multiprocessing.Pool(processes=num_processes) as pool:
+        for start, end in ranges:
+            if len(pending) >= max_pending:
+                stream_range, result = pending.popleft()
+                yield stream_range, result.get()
+            result = pool.apply_async(parse_streams, (dump_path, start, end))
+            pending.append(((start, end), result))
+        while pending:
+            stream_range, result = pending.popleft()
+            yield stream_range, result.get()
+
+
+# Stage 1 of the pipeline for the multistream dump, a drop-in for extract_pages
+# Reads the compressed dump directly, with no decompressed copy on disk
+# redirects is an optional RedirectTable, filled as in extract_pages
+def extract_pages_multistream(
+    dump_path, index_path, stats=None, num_processes=None, redirects=None
+):
+    stats = stats if stats is not None else {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("redirects", 0)
+
+    ranges = read_stream_ranges(dump_path, index_path)
+    file_size = os.path.getsize(dump_path)
+
+    results = parse_ranges(dump_path, ranges, num_processes)
+    for (start, end), (pages, skipped, unlinked) in results:
+        stats["redirects"] += len(skipped)
+        if redirects is not None:
+            for redirect in skipped:
+                redirects.add_redirect(*redirect)
+            for title in unlinked:
+                redirects.add_page(title)
+        for page in pages:
+            if redirects is not None:
+                redirects.add_page(page[0])
+            yield page
+
+            stats["pages"] += 1
+            if stats["pages"] % 1000 == 0:
+                print_progress((end / file_size) * 100, stats)
+
+
+# preprocess_wiki_xml for the multistream dump, with the same output file
+def preprocess_multistream(dump_path, index_path, output_path, num_processes=None):
+    stats = {}
+    pages = extract_pages_multistream(dump_path, index_path, stats, num_processes)
+    write_links_xml(pages, output_path, stats)
+
+    print(f"\nPreprocessing complete!")
+    print(f"Total pages processed: {stats['pages']}")
+    print(f"Total redirects skipped: {stats['redirects']}")
+    print(throughput(stats))
+    print(f"Output file: {output_path}")
+
+
+# Titles with characters that need escaping in XML or that clean_link replaces
+SYNTHETIC_TITLES = ["AC/DC", "Who?", "Tom & Jerry", "C++", "Less <than>"]
+
+
+# Write a small synthetic XML dump with the cases the preprocessing has to handle:
+#   articles, redirects (as a <redirect> tag and as #REDIRECT text), other namespaces,
+#   talk pages, pages without links, and links with labels, anchors, underscores,
+#   lowercase first letters, links to redirects and characters that need escaping
+# Deterministic for a given seed. create_multistream_fixture turns it into a multistream
+#   dump, so the multistream mode can be compared with the serial one
+def create_synthetic_dump(xml_path, num_pages=2000, seed=0):
+    rng = random.Random(seed)
+    titles = [f"Article {i}" for i in range(num_pages)] + SYNTHETIC_TITLES
+
+    def random_link():
+        link = rng.choice(titles)
+        variant = rng.random()
+        if variant < 0.1:
+            link = link.replace(" ", "_")
+        elif variant < 0.2:
+            link += "#Section"
+        elif variant < 0.25:
+            link = link[0].lower() + link[1:]
+        elif variant < 0.3:
+            link = "File:Picture.jpg"
+        elif variant < 0.35:
+            link = f"Redirect {rng.randrange(num_pages)}"
+        if rng.random() < 0.3:
+            return f"[[{link}|label]]"
+        return f"[[{link}]]"
+
+    pages = [
+        (title, " ".join(random_link() for _ in range(3)), "")
+        for title in SYNTHETIC_TITLES
+    ]
+    for i in range(num_pages):
+        kind = rng.random()
+        if kind < 0.1:
+            # Some redirects lead to other redirects, as chains, cycles or dead ends
+            target = rng.choice(titles)
+            if rng.random() < 0.3:
+                target = f"Redirect {rng.randrange(num_pages)}"
+            pages.append((f"Redirect {i}", f"#REDIRECT [[{target}]]", target))
+        elif kind < 0.15:
+            pages.append((f"Redirect {i}", f"#redirect [[{rng.choice(titles)}]]", ""))
+        elif kind < 0.18:
+            pages.append((f"Category:Group {i}", random_link(), ""))
+        elif kind < 0.2:
+            pages.append((f"Talk:Article {i}", random_link(), ""))
+        elif kind < 0.22:
+            pages.append((titles[i], "No links here.", ""))
+        else:
+            links = [random_link() for _ in range(rng.randint(1, 12))]
+            pages.append((titles[i], " and ".join(links), ""))
+    rng.shuffle(pages)
+
+    with open(xml_path, "w", encoding="utf-8") as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">\n')
+        f.write("  <siteinfo>\n    <sitename>Synthetic</sitename>\n  </siteinfo>\n")
+        for page_id, (title, text, redirect) in enumerate(pages, 1):
+            redirect_tag = ""
+            if redirect:
+                redirect_tag = f'    <redirect title="{escape(redirect)}" />\n'
+            f.write(
+                f"  <page>\n    <title>{escape(title)}</title>\n    <ns>0</ns>\n"
+                f"    <id>{page_id}</id>\n{redirect_tag}    <revision>\n"
+                f'      <text xml:space="preserve">{escape(text)}</text>\n'
+                f"    </revision>\n  </page>\n"
+            )
+        f.write("</mediawiki>\n")
+
+
+# Build a small multistream dump and its index from a plain XML dump, as a local fixture
+#   for trying the multistream mode without the real 20GB+ download
+def create_multistream_fixture(input_xml, dump_path, index_path, pages_per_stream=100):
+    with open(input_xml, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    pages = list(re.finditer(r"[ \t]*<page>.*?</page>\n?", text, re.S))
+    header = text[: pages[0].start()] if pages else text
+    footer = text[pages[-1].end() :] if pages else ""
+
+    index_lines = []
+    with open(dump_path, "wb") as dump:
+        dump.write(bz2.compress(header.encode("utf-8")))
+        for i in range(0, len(pages), pages_per_stream):
+            offset = dump.tell()
+            group = pages[i : i + pages_per_stream]
+            for page in group:
+                page_id = re.search(r"<id>(\d+)</id>", page.group()).group(1)
+                title = unescape(
+                    re.search(r"<title>(.*?)</title>", page.group()).group(1)
+                )
+                index_lines.append(f"{offset}:{page_id}:{title}\n")
+            data = "".join(page.group() for page in group)
+            dump.write(bz2.compress(data.encode("utf-8")))
+        if footer:
+            dump.write(bz2.compress(footer.encode("utf-8")))
+
+    with bz2.open(index_path, "wt", encoding="utf-8") as index:
+        index.writelines(index_lines)
+
+
+if __name__ == "__main__":
+    dump_path = "enwiki-20250201-pages-articles-multistream.xml.bz2"
+    index_path = "enwiki-20250201-pages-articles-multistream-index.txt.bz2"
+    output_path = "wiki-links-only.xml"
+    preprocess_multistream(dump_path, index_path, output_path)
@@ -19,42 +19,49 @@ def convert_page_to_obsidian(title, links, output_path):
         f.write("".join(f"[[{link}]]\n" for link in sorted(links)))
 
 
-def convert_to_obsidian(input_xml, output_dir, num_processes=4):
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-
-    page_count = 0
-    total_links = 0
-
-    pool = multiprocessing.Pool(processes=num_processes)
-
+# Read (title, links) pages back from the preprocessed (and cleaned) XML
+def read_links_xml(input_xml):
     with open(input_xml, "rb") as f:
-        pages = []
         for event, elem in iterparse(f, events=("end",)):
             if elem.tag == "page":
                 title = elem.find("title").text
                 links = [link.text for link in elem.findall(".//link")]
-
-                pages.append((title, links))
-                page_count += 1
-                total_links += len(links)
+                yield title, links
 
                 # clear mem
                 elem.clear()
 
-                # process pages in 1000 page chunks
-                if page_count % 1000 == 0:
-                    pool.starmap(
-                        convert_page_to_obsidian,
-                        [(title, links, output_path) for title, links in pages],
-                    )
-                    pages = []
-                    print(f"Processed {page_count} pages ({total_links} total links)")
 
-        if pages:
+# Stage 3 of the pipeline: create the vault from any stream of (title, links) pages
+def write_obsidian_vault(pages, output_dir, num_processes=4):
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    page_count = 0
+    total_links = 0
+
+    pool = multiprocessing.Pool(processes=num_processes)
+
+    batch = []
+    for title, links in pages:
+        batch.append((title, links))
+        page_count += 1
+        total_links += len(links)
+
+        # process pages in 1000 page chunks
+        if page_count % 1000 == 0:
             pool.starmap(
-                convert_page_to_obsidian, [(page, output_path) for page in pages]
+                convert_page_to_obsidian,
+                [(title, links, output_path) for title, links in batch],
             )
+            batch = []
+            print(f"Processed {page_count} pages ({total_links} total links)")
+
+    if batch:
+        pool.starmap(
+            convert_page_to_obsidian,
+            [(title, links, output_path) for title, links in batch],
+        )
 
     pool.close()
     pool.join()
@@ -62,10 +69,14 @@ def convert_to_obsidian(input_xml, output_dir, num_processes=4):
     print(f"\nConversion complete!")
     print(f"Total pages created: {page_count}")
     print(f"Total links processed: {total_links}")
-    print(f"Average links per page: {total_links / page_count:.1f}")
+    print(f"Average links per page: {total_links / max(page_count, 1):.1f}")
     print(f"Output directory: {output_path}")
 
 
+def convert_to_obsidian(input_xml, output_dir, num_processes=4):
+    write_obsidian_vault(read_links_xml(input_xml), output_dir, num_processes)
+
+
 if __name__ == "__main__":
     input_xml = "wiki-links-only-clean.xml"
     output_dir = "obsidian_vault"
@@ -0,0 +1,77 @@
+from preprocess import extract_pages, write_links_xml
+from multistream import extract_pages_multistream
+from clean_links import clean_pages
+from obsidian import write_obsidian_vault
+from redirects import RedirectTable, resolve_pages
+from csr import write_csr_graph
+from time import time
+
+
+# Run preprocess, clean_links and the obsidian conversion as one stream of generators
+# Each page goes through all three stages right after it is parsed, so the dump is read
+#   once and neither wiki-links-only.xml nor wiki-links-only-clean.xml is written
+# output_format "obsidian" creates the vault in output, "xml" writes the cleaned links XML
+#   to output instead (byte for byte the file clean_links.py produces from the output of
+#   preprocess.py) and "csr" the binary link graph, see csr.py. The graph skips
+#   clean_links: it turns links into valid Obsidian file names ("AC/DC" becomes "AC_DC"),
+#   which no longer match the titles
+# Every stage is a plain function over an iterable of (title, links), so the stages still
+#   run on their own through preprocess_wiki_xml, clean_links_xml and convert_to_obsidian
+# With index_path, input_path is the multistream .bz2 dump and is parsed in parallel, see
+#   multistream.py
+# resolve_redirects rewrites links to redirects to the page they redirect to and drops
+#   links to titles that do not exist, see redirects.py. It runs before cleaning, which
+#   only matches titles as they are. Cleaning then renames the canonical links exactly
+#   like the vault's file names, and the graph output is not cleaned at all
+def run_pipeline(
+    input_path,
+    output,
+    output_format="obsidian",
+    num_processes=4,
+    index_path=None,
+    resolve_redirects=False,
+):
+    stats = {}
+    start_time = time()
+
+    table = RedirectTable() if resolve_redirects else None
+    if index_path:
+        pages = extract_pages_multistream(
+            input_path, index_path, stats, num_processes, table
+        )
+    else:
+        pages = extract_pages(input_path, stats, table)
+    if resolve_redirects:
+        pages = resolve_pages(pages, table, stats)
+    if output_format != "csr":
+        pages = clean_pages(pages, stats)
+    if output_format == "obsidian":
+        write_obsidian_vault(pages, output, num_processes)
+    elif output_format == "xml":
+        write_links_xml(pages, output, stats)
+    elif output_format == "csr":
+        write_csr_graph(pages, output, stats)
+    else:
+        raise ValueError(f"unknown output format {output_format}")
+
+    print(f"\nPipeline complete in {time() - start_time:.1f}s!")
+    print(f"Total pages processed: {stats['pages']}")
+    print(f"Total redirects skipped: {stats['redirects']}")
+    if resolve_redirects:
+        print(f"Redirect chains collapsed: {stats['redirect_chains']}")
+        print(
+            f"Dangling redirects (cycles or missing targets): {stats['redirects_dangling']}"
+        )
+        print(f"Links rewritten to their canonical title: {stats['links_rewritten']}")
+        print(f"Dangling links dropped: {stats['dangling_links']}")
+    if "deleted_links" in stats:
+        print(f"Total links deleted while cleaning: {stats['deleted_links']}")
+    if "edges" in stats:
+        print(f"Graph: {stats['nodes']} nodes, {stats['edges']} links")
+    print(f"Output: {output}")
+
+
+if __name__ == "__main__":
+    input_path = "enwiki-20250201-pages-articles-multistream.xml"
+    output_dir = "obsidian_vault"
+    run_pipeline(input_path, output_dir, num_processes=4)
@@ -1,114 +1,164 @@
 import re
 from xml.etree.ElementTree import iterparse
+from collections import namedtuple
+from xml.sax.saxutils import escape
+from batched_writer import BatchedWriter, throughput, BUFFER_SIZE
 import mmap
 import os
 
 
-# preprocess the wiki dump into a more simple XML format with only title and link labels
-def preprocess_wiki_xml(input_path, output_path):
-    with open(output_path, "w", encoding="utf-8") as out:
-        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<mediawiki>\n')
+def extract_wiki_links(text):
+    if not text:
+        return set()
+    pattern = r"\[\[([^|\]]*?)(?:\|[^\]]*?)?\]\]"
+    matches = re.finditer(pattern, text)
+    links = set()
+
+    for match in matches:
+        link = match.group(1).strip()
+        if any(
+            link.startswith(ns + ":")
+            for ns in ["File", "Category", "Template", "Wikipedia", "Help"]
+        ):
+            continue
+        link = link.split("#")[0]  # Remove section anchors
+        link = link.replace("_", " ")
+        links.add(link)
+
+    return links
+
+
+# used to ignore page entries that are redirects to real pages
+def is_redirect(elem):
+    # Check for redirect tag
+    redirect_elem = elem.find(".//{*}redirect")
+    if redirect_elem is not None:
+        return redirect_elem.get("title")
+
+    # Check for #REDIRECT in text
+    text_elem = elem.find(".//{*}text")
+    if text_elem is not None and text_elem.text:
+        text = text_elem.text.strip()
+        if text.upper().startswith("#REDIRECT"):
+            matches = re.findall(r"\[\[([^|\]]*?)(?:\|[^\]]*?)?\]\]", text)
+            if matches:
+                return matches[0].strip()
+
+    return None
+
+
+# A redirect in the result of parse_page
+Redirect = namedtuple("Redirect", ["title", "target"])
+
+
+# What a <page> element contributes: (title, sorted links) for an article, a Redirect for
+#   a redirect and None for anything else. The links of an article may be empty
+def parse_page(elem):
+    title_elem = elem.find(".//{*}title")
+    if title_elem is None:
+        return None
+    title = title_elem.text
+
+    # Skip non-article namespaces
+    if ":" in title and not title.startswith("Talk:"):
+        return None
 
-    def extract_wiki_links(text):
-        if not text:
-            return set()
-        pattern = r"\[\[([^|\]]*?)(?:\|[^\]]*?)?\]\]"
-        matches = re.finditer(pattern, text)
-        links = set()
-
-        for match in matches:
-            link = match.group(1).strip()
-            if any(
-                link.startswith(ns + ":")
-                for ns in ["File", "Category", "Template", "Wikipedia", "Help"]
-            ):
-                continue
-            link = link.split("#")[0]  # Remove section anchors
-            link = link.replace("_", " ")
-            links.add(link)
-
-        return links
-
-    # used to ignore page entries that are redirects to real pages
-    def is_redirect(elem):
-        # Check for redirect tag
-        redirect_elem = elem.find(".//{*}redirect")
-        if redirect_elem is not None:
-            return redirect_elem.get("title")
-
-        # Check for #REDIRECT in text
-        text_elem = elem.find(".//{*}text")
-        if text_elem is not None and text_elem.text:
-            text = text_elem.text.strip()
-            if text.upper().startswith("#REDIRECT"):
-                matches = re.findall(r"\[\[([^|\]]*?)(?:\|[^\]]*?)?\]\]", text)
-                if matches:
-                    return matches[0].strip()
+    # Redirects are skipped, but their target is needed to resolve links to them
+    target = is_redirect(elem)
+    if target:
+        return Redirect(title, target)
 
+    # Process regular article
+    text_elem = elem.find(".//{*}text")
+    if text_elem is None:
         return None
+    links = extract_wiki_links(text_elem.text or "")
+    return title, sorted(links)
+
+
+# Includes the write throughput once a BatchedWriter has put it in stats
+def print_progress(progress, stats):
+    written = f" - {throughput(stats)}" if "written_bytes" in stats else ""
+    print(
+        f"Progress: {progress:.1f}% - Processed {stats['pages']} pages (Skipped {stats['redirects']} redirects){written}"
+    )
+
+
+# Stage 1 of the pipeline: read the wiki dump once and yield (title, sorted links) for
+#   every article that links somewhere, skipping non-article namespaces and redirects
+# Counts go into the stats dict if one is given. With a RedirectTable (see redirects.py)
+#   as redirects, every redirect and every article title is also recorded in it
+def extract_pages(input_path, stats=None, redirects=None):
+    stats = stats if stats is not None else {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("redirects", 0)
 
     file_size = os.path.getsize(input_path)
-    processed_bytes = 0
-    page_count = 0
-    redirect_count = 0
 
     with open(input_path, "rb") as f:
         mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
         for event, elem in iterparse(mm, events=("end",)):
             if elem.tag.endswith("page"):
-                title_elem = elem.find(".//{*}title")
-
-                if title_elem is not None:
-                    title = title_elem.text
-
-                    # Skip non-article namespaces
-                    if ":" in title and not title.startswith("Talk:"):
-                        elem.clear()
-                        continue
+                page = parse_page(elem)
+                elem.clear()
 
-                    # Check for redirect
-                    redirect_target = is_redirect(elem)
-                    if redirect_target:
-                        redirect_count += 1
-                        # Skip redirects
-                        elem.clear()
+                if isinstance(page, Redirect):
+                    stats["redirects"] += 1
+                    if redirects is not None:
+                        redirects.add_redirect(*page)
+                elif page:
+                    if redirects is not None:
+                        redirects.add_page(page[0])
+                    if not page[1]:
                         continue
+                    yield page
 
-                    # Process regular article
-                    text_elem = elem.find(".//{*}text")
-                    if text_elem is not None:
-                        content = text_elem.text or ""
-                        links = extract_wiki_links(content)
-
-                        if links:
-                            with open(output_path, "a", encoding="utf-8") as out:
-                                out.write(f"  <page>\n")
-                                out.write(f"    <title>{title}</title>\n")
-                                out.write(f"    <links>\n")
-                                for link in sorted(links):
-                                    out.write(f"      <link>{link}</link>\n")
-                                out.write(f"    </links>\n")
-                                out.write(f"  </page>\n")
-
-                            page_count += 1
-                            if page_count % 1000 == 0:
-                                processed_bytes = mm.tell()
-                                progress = (processed_bytes / file_size) * 100
-                                print(
-                                    f"Progress: {progress:.1f}% - Processed {page_count} pages (Skipped {redirect_count} redirects)"
-                                )
-
-                elem.clear()
+                    stats["pages"] += 1
+                    if stats["pages"] % 1000 == 0:
+                        print_progress((mm.tell() / file_size) * 100, stats)
 
         mm.close()
 
-    with open(output_path, "a", encoding="utf-8") as out:
+
+# Write (title, links) pages in the simple XML format with only title and link labels
+# The file stays open for the whole run and each page is a single string for the
+#   BatchedWriter. buffer_size, fsync and background are passed on to it
+# Titles and links are escaped, so "&" and "<" in them keep the file well-formed
+def write_links_xml(
+    pages,
+    output_path,
+    stats=None,
+    buffer_size=BUFFER_SIZE,
+    fsync="never",
+    background=False,
+):
+    with BatchedWriter(output_path, buffer_size, fsync, background, stats=stats) as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<mediawiki>\n')
+        for title, links in pages:
+            link_lines = "".join(
+                f"      <link>{escape(link)}</link>\n" for link in links
+            )
+            out.write(
+                f"  <page>\n    <title>{escape(title)}</title>\n    <links>\n"
+                f"{link_lines}    </links>\n  </page>\n"
+            )
         out.write("</mediawiki>")
 
+
+# preprocess the wiki dump into a more simple XML format with only title and link labels
+# background=True writes on a separate thread while the dump is parsed
+def preprocess_wiki_xml(
+    input_path, output_path, buffer_size=BUFFER_SIZE, fsync="never", background=False
+):
+    stats = {}
+    pages = extract_pages(input_path, stats)
+    write_links_xml(pages, output_path, stats, buffer_size, fsync, background)
+
     print(f"\nPreprocessing complete!")
-    print(f"Total pages processed: {page_count}")
-    print(f"Total redirects skipped: {redirect_count}")
+    print(f"Total pages processed: {stats['pages']}")
+    print(f"Total redirects skipped: {stats['redirects']}")
+    print(throughput(stats))
     print(f"Output file: {output_path}")
 
 
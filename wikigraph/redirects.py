@@ -0,0 +1,167 @@
+from tempfile import TemporaryFile
+from itertools import batched
+from array import array
+import numpy as np
+import hashlib
+import marshal
+
+# Redirect resolution: links to a redirect are rewritten to the page the redirect points
+#   to, and links to titles that are neither a page nor a redirect are dropped
+# The table is filled while the dump is parsed. Titles are stored as 64 bit hashes in
+#   flat arrays instead of as strings in a dict, which keeps 11M redirects and 7M pages at
+#   a few hundred MB. Only the distinct redirect targets are kept as strings, they are
+#   what links get rewritten to. With 64 bit hashes, a collision among ~20M titles has a
+#   probability of about 10^-5
+# finalize sorts the hashes for binary search and collapses chains (A -> B -> C becomes
+#   A -> C) by pointer jumping over the target array: every round follows two hops at
+#   once, so log2(longest chain) rounds resolve everything. Redirects that still have not
+#   reached a page afterwards go around in a cycle (or end in a missing page) and count as
+#   dangling
+BATCH_PAGES = 1024
+
+
+# MediaWiki treats "foo bar", "Foo_bar" and "Foo bar#History" as the same page
+def normalize_title(title):
+    title = title.split("#")[0].replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def title_hash(title):
+    digest = hashlib.blake2b(normalize_title(title).encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def title_hashes(titles):
+    return np.fromiter((title_hash(title) for title in titles), dtype=np.uint64)
+
+
+# Positions of values in a sorted array, -1 where a value is missing
+def lookup(sorted_keys, values):
+    positions = np.searchsorted(sorted_keys, values)
+    positions[positions == len(sorted_keys)] = 0
+    found = len(sorted_keys) > 0
+    if found:
+        found = sorted_keys[positions] == values
+    return np.where(found, positions, -1)
+
+
+# array[positions], with -1 where a position is -1 (also when the array is empty)
+def take(array, positions):
+    if len(array) == 0:
+        return np.full(len(positions), -1, dtype=np.int64)
+    return np.where(positions >= 0, array[np.maximum(positions, 0)], -1)
+
+
+class RedirectTable:
+    def __init__(self):
+        self.page_keys = array("Q")
+        self.redirect_keys = array("Q")
+        self.redirect_targets = array("I")
+        self.target_ids = {}
+        self.targets = []
+
+    def add_page(self, title):
+        self.page_keys.append(title_hash(title))
+
+    def add_redirect(self, title, target):
+        target = normalize_title(target)
+        target_id = self.target_ids.setdefault(target, len(self.targets))
+        if target_id == len(self.targets):
+            self.targets.append(target)
+        self.redirect_keys.append(title_hash(title))
+        self.redirect_targets.append(target_id)
+
+    def __len__(self):
+        return len(self.redirect_keys)
+
+    # Sort the hashes and resolve every redirect target to a page, see the top
+    # The number of collapsed chains and of dangling redirects go into the stats dict
+    def finalize(self, stats=None):
+        stats = stats if stats is not None else {}
+        self.target_ids = None
+        self.pages = np.unique(np.frombuffer(self.page_keys, dtype=np.uint64))
+
+        keys = np.frombuffer(self.redirect_keys, dtype=np.uint64)
+        self.redirects, first = np.unique(keys, return_index=True)
+        redirect_targets = np.frombuffer(self.redirect_targets, dtype=np.uint32)
+        redirect_targets = redirect_targets[first].astype(np.int64)
+
+        # next_target[t] is the target that target t redirects to, t itself for a page and
+        #   -1 for a title that is neither
+        target_keys = title_hashes(self.targets)
+        is_page = lookup(self.pages, target_keys) >= 0
+        redirect = lookup(self.redirects, target_keys)
+        next_target = take(redirect_targets, redirect)
+        next_target[is_page] = np.flatnonzero(is_page)
+        next_target = np.append(next_target, -1)  # -1 indexes this, and stays -1
+
+        for _ in range(max(1, len(next_target)).bit_length()):
+            next_target = next_target[next_target]
+        canonical = next_target[:-1]
+        canonical[~is_page[np.maximum(canonical, 0)] | (canonical < 0)] = -1
+
+        # Canonical target of every redirect, -1 for dangling ones
+        self.resolved = canonical[redirect_targets]
+
+        dangling = self.resolved < 0
+        stats["redirect_chains"] = int((~is_page[redirect_targets] & ~dangling).sum())
+        stats["redirects_dangling"] = int(dangling.sum())
+        return stats
+
+    # Canonical titles for a batch of links, None for links that lead nowhere
+    def resolve(self, links):
+        keys = title_hashes(links)
+        is_page = lookup(self.pages, keys) >= 0
+        redirect = lookup(self.redirects, keys)
+        canonical = take(self.resolved, redirect)
+
+        resolved = []
+        for link, page, target in zip(links, is_page.tolist(), canonical.tolist()):
+            if page:
+                resolved.append(normalize_title(link))
+            elif target >= 0:
+                resolved.append(self.targets[target])
+            else:
+                resolved.append(None)
+        return resolved
+
+
+# Pipeline stage: rewrite the links of (title, links) pages to canonical titles and drop
+#   dangling ones, with the table filled by the stage before it
+# The table is complete only once the whole dump is parsed, so the pages are spooled to
+#   a temporary file first and resolved in a second pass over it, in batches
+# Links are deduplicated again after rewriting, and a page never links to itself
+def resolve_pages(pages, table, stats=None):
+    stats = stats if stats is not None else {}
+    stats.setdefault("links_rewritten", 0)
+    stats.setdefault("dangling_links", 0)
+
+    with TemporaryFile() as spool:
+        for page in pages:
+            marshal.dump(page, spool)
+        table.finalize(stats)
+        spool.seek(0)
+
+        for batch in batched(spooled_pages(spool), BATCH_PAGES):
+            links = [link for title, page_links in batch for link in page_links]
+            resolved = iter(table.resolve(links))
+            for title, page_links in batch:
+                canonical_links = []
+                for link in page_links:
+                    canonical = next(resolved)
+                    if canonical is None:
+                        stats["dangling_links"] += 1
+                        continue
+                    if canonical != normalize_title(link):
+                        stats["links_rewritten"] += 1
+                    if canonical != title:
+                        canonical_links.append(canonical)
+                yield title, sorted(set(canonical_links))
+
+
+def spooled_pages(spool):
+    while True:
+        try:
+            yield marshal.load(spool)
+        except EOFError:
+            return
@@ -0,0 +1,87 @@
+from collections import deque
+from multistream import create_synthetic_dump
+from pipeline import run_pipeline
+from csr import CSRGraph
+import analytics
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def graph(tmp_path):
+    create_synthetic_dump(tmp_path / "dump.xml", 400)
+    run_pipeline(tmp_path / "dump.xml", tmp_path / "graph", "csr")
+    return CSRGraph(tmp_path / "graph")
+
+
+def links(graph):
+    return [(u, int(v)) for u in range(len(graph)) for v in graph.neighbors(u)]
+
+
+# Tiny chunks, so every frontier and edge pass is split into many slices
+def test_bfs_matches_plain_bfs(graph):
+    neighbors = {u: [int(v) for v in graph.neighbors(u)] for u in range(len(graph))}
+    for source in range(0, len(graph), 37):
+        expected = {source: 0}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v in neighbors[u]:
+                if v not in expected:
+                    expected[v] = expected[u] + 1
+                    queue.append(v)
+
+        parents, distances = analytics.bfs(graph, source, chunk_edges=5)
+        assert {u: d for u, d in enumerate(distances) if d >= 0} == expected
+        for u, d in expected.items():
+            if d:
+                assert distances[parents[u]] == d - 1 and u in neighbors[parents[u]]
+
+
+def test_shortest_path_follows_links(graph):
+    path = analytics.shortest_path(graph, "Who?", "AC/DC")
+    nodes = [graph.find(title) for title in path]
+    assert all(v in graph.neighbors(u) for u, v in zip(nodes, nodes[1:]))
+    parents, distances = analytics.bfs(graph, nodes[0])
+    assert len(path) - 1 == distances[nodes[-1]]
+
+
+def test_components_match_union_find(graph):
+    parent = list(range(len(graph)))
+
+    def root(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for u, v in links(graph):
+        ru, rv = root(u), root(v)
+        parent[max(ru, rv)] = min(ru, rv)
+    expected = [root(x) for x in range(len(graph))]
+
+    labels = analytics.weakly_connected_components(graph, chunk_edges=7)
+    assert labels.tolist() == expected
+
+
+def test_pagerank_matches_dense_iteration(graph):
+    n = len(graph)
+    matrix = np.zeros((n, n))
+    for u, v in links(graph):
+        matrix[v, u] += 1 / len(graph.neighbors(u))
+    dangling = graph.out_degrees() == 0
+
+    expected = np.full(n, 1 / n)
+    for _ in range(200):
+        spread = (0.15 + 0.85 * expected[dangling].sum()) / n
+        expected = spread + 0.85 * matrix @ expected
+
+    rank, iterations = analytics.pagerank(graph, tolerance=1e-12, chunk_edges=11)
+    assert np.allclose(rank, expected, atol=1e-10)
+    assert rank.sum() == pytest.approx(1)
+
+
+def test_degree_distributions(graph):
+    distributions = analytics.degree_distributions(graph)
+    in_degrees = np.bincount([v for u, v in links(graph)], minlength=len(graph))
+    assert (distributions["in"] == np.bincount(in_degrees)).all()
+    assert distributions["out"].sum() == len(graph)
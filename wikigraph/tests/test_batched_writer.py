@@ -0,0 +1,38 @@
+from batched_writer import BatchedWriter
+import pytest
+
+
+# Raw file that accepts at most a few bytes per write, like a write cut short by a signal
+class ShortWrites:
+    def __init__(self, file, limit=7):
+        self.file = file
+        self.limit = limit
+
+    def write(self, data):
+        return self.file.write(data[: self.limit])
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_short_writes_are_completed(tmp_path, background):
+    path = tmp_path / "out.txt"
+    lines = [f"line {i} ü\n" for i in range(1000)]
+    stats = {}
+    writer = BatchedWriter(
+        path, buffer_size=100, fsync="batch", background=background, stats=stats
+    )
+    writer.file = ShortWrites(writer.file)
+    with writer:
+        for line in lines:
+            writer.write(line)
+
+    expected = "".join(lines)
+    assert path.read_text(encoding="utf-8") == expected
+    assert stats["written_bytes"] == len(expected.encode("utf-8"))
+
+
+def test_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        BatchedWriter(tmp_path / "out.txt", fsync="sometimes")
@@ -0,0 +1,46 @@
+from multistream import create_synthetic_dump
+from preprocess import extract_pages, preprocess_wiki_xml
+from pipeline import run_pipeline
+from csr import CSRGraph, convert_to_csr
+import pytest
+
+
+@pytest.fixture
+def dump(tmp_path):
+    xml_path = tmp_path / "dump.xml"
+    create_synthetic_dump(xml_path, 500)
+    return xml_path
+
+
+# Every page's links lead to the nodes named exactly like the linked titles, also for
+#   titles that clean_links would rename ("AC/DC", "Who?")
+def check_links_resolve(graph, xml_path):
+    for title, links in extract_pages(xml_path):
+        node = graph.find(title)
+        assert node >= 0
+        neighbors = sorted(graph.title(target) for target in graph.neighbors(node))
+        assert neighbors == sorted({link for link in links if link})
+
+
+def test_pipeline_links_resolve_to_pages(dump, tmp_path):
+    run_pipeline(dump, tmp_path / "graph", "csr")
+    graph = CSRGraph(tmp_path / "graph")
+    check_links_resolve(graph, dump)
+
+    for title in ["AC/DC", "Who?", "Tom & Jerry"]:
+        node = graph.find(title)
+        assert node >= 0
+        assert (graph.targets == node).any()
+    assert graph.find("AC_DC") == -1
+
+
+def test_convert_to_csr_matches_pipeline(dump, tmp_path):
+    preprocess_wiki_xml(dump, tmp_path / "links.xml")
+    convert_to_csr(tmp_path / "links.xml", tmp_path / "converted")
+    run_pipeline(dump, tmp_path / "graph", "csr")
+
+    converted = CSRGraph(tmp_path / "converted", mmap=False)
+    graph = CSRGraph(tmp_path / "graph", mmap=False)
+    check_links_resolve(converted, dump)
+    for name in ["offsets", "targets", "titles", "title_offsets"]:
+        assert (getattr(converted, name) == getattr(graph, name)).all()
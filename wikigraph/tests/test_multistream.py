@@ -0,0 +1,32 @@
+from multistream import (
+    create_synthetic_dump,
+    create_multistream_fixture,
+    preprocess_multistream,
+)
+from preprocess import preprocess_wiki_xml
+
+
+# Small streams so the dump is split into many tasks for the pool
+def make_fixture(tmp_path, num_pages=600):
+    xml_path = tmp_path / "dump.xml"
+    dump_path = tmp_path / "dump.xml.bz2"
+    index_path = tmp_path / "index.txt.bz2"
+    create_synthetic_dump(xml_path, num_pages)
+    create_multistream_fixture(xml_path, dump_path, index_path, pages_per_stream=5)
+    return xml_path, dump_path, index_path
+
+
+def test_multistream_matches_serial(tmp_path):
+    xml_path, dump_path, index_path = make_fixture(tmp_path)
+    preprocess_wiki_xml(xml_path, tmp_path / "serial.xml")
+    preprocess_multistream(dump_path, index_path, tmp_path / "multi.xml", 2)
+
+    serial = (tmp_path / "serial.xml").read_bytes()
+    assert serial.count(b"<page>") > 400
+    assert (tmp_path / "multi.xml").read_bytes() == serial
+
+
+def test_synthetic_dump_is_deterministic(tmp_path):
+    create_synthetic_dump(tmp_path / "a.xml", 100, seed=3)
+    create_synthetic_dump(tmp_path / "b.xml", 100, seed=3)
+    assert (tmp_path / "a.xml").read_bytes() == (tmp_path / "b.xml").read_bytes()
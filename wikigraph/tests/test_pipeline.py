@@ -0,0 +1,18 @@
+from multistream import create_synthetic_dump
+from preprocess import preprocess_wiki_xml
+from clean_links import clean_links_xml
+from pipeline import run_pipeline
+
+
+# The streamed pipeline writes the same file as running the stages one after another
+def test_xml_output_matches_stages(tmp_path):
+    dump = tmp_path / "dump.xml"
+    create_synthetic_dump(dump, 3000)
+    preprocess_wiki_xml(dump, tmp_path / "links.xml")
+    clean_links_xml(tmp_path / "links.xml", tmp_path / "clean.xml")
+    run_pipeline(dump, tmp_path / "pipeline.xml", "xml")
+
+    clean = (tmp_path / "clean.xml").read_bytes()
+    assert clean.count(b"<link>") > 10000
+    assert b"<link>AC_DC</link>" in clean
+    assert (tmp_path / "pipeline.xml").read_bytes() == clean
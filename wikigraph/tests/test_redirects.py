@@ -0,0 +1,67 @@
+from xml.etree.ElementTree import iterparse
+from multistream import create_synthetic_dump
+from preprocess import parse_page, Redirect
+from redirects import normalize_title
+from pipeline import run_pipeline
+from csr import CSRGraph
+
+
+# Links of every article resolved with plain dicts: follow redirects until a page is
+#   reached, drop the link on a cycle or at a title that is neither
+def expected_links(xml_path):
+    articles, redirects = {}, {}
+    for event, elem in iterparse(xml_path, events=("end",)):
+        if elem.tag.endswith("page"):
+            page = parse_page(elem)
+            if isinstance(page, Redirect):
+                redirects.setdefault(
+                    normalize_title(page.title), normalize_title(page.target)
+                )
+            elif page:
+                articles[page[0]] = page[1]
+
+    def resolve(link):
+        title, seen = normalize_title(link), set()
+        while title not in articles and title in redirects and title not in seen:
+            seen.add(title)
+            title = redirects[title]
+        return title if title in articles else None
+
+    expected = {}
+    for title, links in articles.items():
+        resolved = {resolve(link) for link in links} - {None, title}
+        if links:
+            expected[title] = sorted(resolved)
+    return expected
+
+
+def graph_links(graph):
+    return {
+        graph.title(node): sorted(graph.title(t) for t in graph.neighbors(node))
+        for node in range(len(graph))
+        if len(graph.neighbors(node))
+    }
+
+
+def test_links_resolve_to_pages(tmp_path):
+    create_synthetic_dump(tmp_path / "dump.xml", 1000)
+    run_pipeline(
+        tmp_path / "dump.xml", tmp_path / "graph", "csr", resolve_redirects=True
+    )
+
+    expected = expected_links(tmp_path / "dump.xml")
+    assert graph_links(CSRGraph(tmp_path / "graph")) == {
+        title: links for title, links in expected.items() if links
+    }
+
+
+def test_dump_without_redirects(tmp_path):
+    xml_path = tmp_path / "dump.xml"
+    xml_path.write_text(
+        "<mediawiki>"
+        "<page><title>A</title><revision><text>[[b]] [[Missing]]</text></revision></page>"
+        "<page><title>B</title><revision><text>[[A#Top]]</text></revision></page>"
+        "</mediawiki>"
+    )
+    run_pipeline(xml_path, tmp_path / "graph", "csr", resolve_redirects=True)
+    assert graph_links(CSRGraph(tmp_path / "graph")) == {"A": ["B"], "B": ["A"]}